@@ -1,134 +1,279 @@
-from neo4j import GraphDatabase
-from langchain_openai import ChatOpenAI
-from langgraph_supervisor import create_supervisor
-from langgraph.prebuilt import create_react_agent
-from langchain_anthropic import ChatAnthropic
-from tools import get_all_meals,get_and_update_old_meals,create_meal_graph, get_all_meals,tool
-
-
-
-# Load API keys securely
-import json
-with open('config.json') as f:
-    config = json.load(f)
-ANTHROPIC_API_KEY = config["ANTHROPIC_API_KEY"]
-
-# Meal Checker Supervisor: Retrieves 4 meals from Neo4j
-model2 = ChatAnthropic(model="claude-3-7-sonnet-20250219", api_key=ANTHROPIC_API_KEY)
-model = ChatAnthropic(model="claude-3-5-haiku-20241022", api_key=ANTHROPIC_API_KEY)
-
-meal_checker = create_react_agent(
-    model=model,
-    tools=[get_and_update_old_meals],
-    name="meal_checker",
-    prompt="""
-You are a meal planner assistant that first checks the user's previous meal history using the get_and_update_old_meals function.
-You must:
-1️⃣ Query the database to get ** meals that have not been shown to the user in the last 2 weeks** by calling `get_and_update_old_meals(meal_plan)`.
-2️⃣ Present these meals to the user and ask **if they would like to proceed with them**.
-3️⃣ If the user agrees, **log that these meals have been shown today** and pass them to the next agent.
-4️⃣ If the user does not agree, instruct the personal chef to generate new meals.
-
-Return the selected meals in the following JSON format:
-{
-  "use_existing_meals": <true/false>,
-  "selected_meals": [
-    {
-      "day": <number>,
-      "name": <string>,
-      "instructions": <string>
-    },
-    ...
-  ]
-}"""
-)
-
-personal_chef = create_react_agent(
-    model=model,
-    tools=[tool,get_all_meals],
-    name="personal_chef",
-    prompt="""You are a personal chef who specializes in crafting healthy, balanced vegetarian meal use the tool to genarte meals. 
-    check if the meal is present in data base using is_meal_in_db.
-    
-Plan **vegetarian dinners** that are balanced and nutritious. You are an expert in creating delicious, healthy meal options 
+import asyncio
+import functools
+from langchain_core.messages import HumanMessage, SystemMessage
+from meal_repository import get_repository
+from meal_models import GroceryList, MealPlan, PushResult, ainvoke_structured, invoke_structured, valid_meals
+from optimizer import optimize_meal_plan
+from grocery import grocery_list_from_plan
+from ingredients import canonical_ingredients
+from llm_cache import cache_for
+from settings import load_config
+from tools import create_meal_graph,tool,rotation_settings
+
+
+SONNET = "claude-3-7-sonnet-20250219"
+HAIKU = "claude-3-5-haiku-20241022"
+
+
+def chat_model(model_name, agent_name):
+    """Build a rate-limited ChatAnthropic client for an agent, using the shared response cache unless the agent opts out."""
+    from limited_chat import RateLimitedChatAnthropic
+
+    # Load API keys securely
+    api_key = load_config()["ANTHROPIC_API_KEY"]
+    return RateLimitedChatAnthropic(model=model_name, api_key=api_key, cache=cache_for(agent_name))
+
+
+def check_old_meals(user_id=None, plan_id=None):
+    """Run the rotation lookup for a household directly and return the selected_meals payload, without any model call.
+    Repeating the lookup for the same `plan_id` returns the same meals."""
+    rotation = rotation_settings()
+    meals = get_repository().get_and_mark_old_meals(
+        user_id or rotation["user_id"], count=rotation["count"], weeks=rotation["window_weeks"], plan_id=plan_id
+    )
+    return {
+        "use_existing_meals": bool(meals),
+        "selected_meals": [
+            {"day": day, "name": meal["name"], "instructions": meal["instructions"]}
+            for day, meal in enumerate(meals, start=1)
+        ]
+    }
+
+
+def meal_checker_node(state, config, name="meal_checker"):
+    """Put the household's recycled meals in the plan state. Shared by both planning modes;
+    `config` carries the plan's checkpoint thread, which makes the rotation write idempotent."""
+    from checkpoints import plan_id
+    from plan_state import recycled_summary
+
+    selected = check_old_meals(state.get("user_id"), plan_id(config))["selected_meals"]
+    return {"selected_meals": selected, "messages": [recycled_summary(name, selected)]}
+
+
+def _single_node_agent(name, node, state, node_name):
+    """Compile a graph named `name` that runs `node` once on `state`, as node `node_name`."""
+    from langgraph.graph import END, START, StateGraph
+
+    graph = StateGraph(state)
+    graph.add_node(node_name, node)
+    graph.add_edge(START, node_name)
+    graph.add_edge(node_name, END)
+    return graph.compile(name=name)
+
+
+def build_meal_checker(name="meal_checker"):
+    """Compile a single-node graph that puts the recycled meals in the plan state."""
+    from plan_state import PlanState
+
+    return _single_node_agent(name, functools.partial(meal_checker_node, name=name), PlanState, "meal_checker")
+
+
+PERSONAL_CHEF_PROMPT = """You are a personal chef who specializes in crafting healthy, balanced vegetarian meals.
+
+Plan **vegetarian dinners** that are balanced and nutritious. You are an expert in creating delicious, healthy meal options
 for a young, active individual. Each meal should contain **carbohydrates, protein, and fiber**.
 
-For each meal, provide the following details:
+Use the recipe ideas from the web as inspiration. For each meal provide:
 - **Meal Name**
-- **Main Ingredients**
+- **Main Ingredients** (names only, no quantities)
 - **Protein Source**
 - **Cooking Method**
 - **Step-by-step Cooking Instructions**
 
-Return the meals in this **structured JSON format**:
-{
-  "meal_plan": [
-    {
-      "name": <string>,
-      "main_ingredients": [<string>, ...],
-      "protein_source": [<string>, ...],
-      "cooking_method": <string>,
-      "instructions": <detailed step-by-step instructions as a string>
-    },
-    {
-      "name": <string>,
-      "main_ingredients": [<string>, ...],
-      "protein_source": [<string>, ...],
-      "cooking_method": <string>,
-      "instructions": <detailed step-by-step instructions as a string>
-    }
-  ]
-}
+Return the meals by calling `MealPlan`.
 """
-)
-
-
-meal_pusher = create_react_agent(
-    model=model,
-    tools=[get_all_meals, create_meal_graph],
-    name="meal_pusher",
-    prompt="""You are responsible for adding newly generated meals into the Neo4j database.
-    
-Follow these steps:
-1️⃣ **Ensure each new meal is not already in the database using get_all_meals. Get the optimized meals if it**
-2️⃣ **If a meal is new, insert it into Neo4j using create_meal_graph** with last_shown set to today's date.
-3️⃣ **Link ingredients** to the meal and label proteins properly.
-input : make sure the meals are structured in this way before you pass it to create_meal_graph
-example1:
-{
-        "name": "Vegetarian Quinoa Bowl",
-        "instructions": "Cook quinoa and roast vegetables.",
-        "main_ingredients": ["quinoa", "broccoli", "bell peppers"],
-        "protein_source": ["quinoa"]
-}
 
-Return confirmation in this JSON format:
-{
-  "pushed_meals": [<list of meal names successfully added>]
-}"""
-)
 
+def message_text(message):
+    """Return the plain text of a chat message, flattening content blocks."""
+    content = message.content
+    if isinstance(content, list):
+        return "".join(block.get("text", "") for block in content if isinstance(block, dict))
+    return content
+
+
+def optimize_candidates(selected_meals, generated_meals):
+    """Look up the recycled meals' ingredients in the graph and consolidate them with the new meals.
+
+    Ingredients labelled :Protein in the graph count as proteins even where a new meal lists them
+    as main ingredients, so the optimizer never trades one for a vegetable.
+    """
+    repository = get_repository()
+    details = repository.get_meal_ingredients([meal["name"] for meal in selected_meals])
+    recycled = [
+        {**details.get(meal["name"], {}), "name": meal["name"], "instructions": meal.get("instructions", "")}
+        for meal in selected_meals
+    ]
+    meals = recycled + list(generated_meals)
+    names = canonical_ingredients(
+        ingredient for meal in meals for ingredient in meal.get("main_ingredients", []) + meal.get("protein_source", [])
+    )
+    return optimize_meal_plan(meals, protein_ingredients=repository.get_protein_names(names))
+
+
+def recipe_ideas(query):
+    """Search results for personal_chef to draw on, as prompt text; empty if the search fails."""
+    try:
+        results = tool(query)
+        if not isinstance(results, list):
+            print(f"Recipe search returned no results list: {str(results)[:200]}")
+            return ""
+        return "\n".join(f"- {result.get('content', '')}" for result in results if isinstance(result, dict))
+    except Exception as e:
+        print(f"Recipe search failed: {e}")
+        return ""
+
+
+def chef_messages(request, ideas):
+    content = f"{request}\n\nRecipe ideas from the web:\n{ideas}" if ideas else request
+    return [SystemMessage(content=PERSONAL_CHEF_PROMPT), HumanMessage(content=content)]
+
+
+def chef_request(state):
+    """The latest user request in the state, and the recipe search query to go with it."""
+    request = next((message.content for message in reversed(state["messages"]) if message.type == "human"), "")
+    return request, state.get("recipe_query") or "healthy vegetarian dinner"
+
+
+def build_personal_chef(name="personal_chef"):
+    """Compile a graph that searches for recipe ideas, then gets the meals as a validated MealPlan in one model call."""
+    from langchain_core.runnables import RunnableLambda
+    from plan_state import ChefState, generated_summary
+
+    model = chat_model(HAIKU, name)
+
+    def chef_output(plan):
+        meals = [meal.model_dump() for meal in plan.meal_plan]
+        return {"generated_meals": meals, "messages": [generated_summary(name, meals)]}
+
+    def personal_chef_node(state: ChefState):
+        request, query = chef_request(state)
+        return chef_output(invoke_structured(model, MealPlan, chef_messages(request, recipe_ideas(query))))
 
-menu_optimizer = create_react_agent(
-    model=model,
-    tools=[],  # No external tools needed for this agent
-    name="menu_optimizer",
-    prompt="""Your expertise in cooking techniques and recipes allows you to suggest appropriate replacements for ingredients 
-that maintain the overall nutritional balance of the menu. Your task is to determine when to swap one ingredient for another, 
-ensuring that every meal's nutritional needs are met while consolidating the recipes to use the fewest unique ingredients possible. 
-Optimize the menu so that ingredient variety is minimized without compromising taste, quality, or the clarity of the cooking instructions."""
-)
+    async def apersonal_chef_node(state: ChefState):
+        request, query = chef_request(state)
+        ideas = await asyncio.to_thread(recipe_ideas, query)
+        return chef_output(await ainvoke_structured(model, MealPlan, chef_messages(request, ideas)))
 
-grocery_shopper = create_react_agent(
-    model=model,
-    tools=[],  # No external tools needed.
-    name="grocery_shopper",
-    prompt="""You are a professional grocery shopper who converts a meal plan into a structured shopping list.
-Given a meal plan, generate an ordered list of ingredients that consolidates items for efficient shopping.
-Return the grocery list as a JSON array of strings under the key "grocery_list"."""
-)
+    return _single_node_agent(
+        name, RunnableLambda(personal_chef_node, apersonal_chef_node), ChefState, "personal_chef"
+    )
 
 
+def menu_optimizer_node(state, name="menu_optimizer"):
+    """Optimize the plan state's meals into a validated optimized_meal_plan. Shared by both planning modes."""
+    from plan_state import optimized_summary
 
+    optimized = optimize_candidates(state.get("selected_meals") or [], state.get("generated_meals") or [])
+    return {
+        "optimized_meal_plan": MealPlan(meal_plan=optimized["optimized_meal_plan"]).model_dump()["meal_plan"],
+        "messages": [optimized_summary(name, optimized)],
+    }
+
+
+def grocery_shopper_node(state, name="grocery_shopper"):
+    """Build the validated, categorized grocery list for the plan state. Shared by both planning modes."""
+    from plan_state import grocery_summary
+
+    meal_plan = state.get("optimized_meal_plan") or (state.get("selected_meals") or []) + (state.get("generated_meals") or [])
+    grocery_list = GroceryList(grocery_list_from_plan(meal_plan)).root
+    return {"grocery_list": grocery_list, "messages": [grocery_summary(name, grocery_list)]}
+
+
+def build_menu_optimizer(name="menu_optimizer"):
+    """Compile a single-node graph that runs the local ingredient optimizer on the meals in the plan state."""
+    from plan_state import PlanState
+
+    return _single_node_agent(name, functools.partial(menu_optimizer_node, name=name), PlanState, "menu_optimizer")
+
+
+def build_grocery_shopper(name="grocery_shopper"):
+    """Compile a single-node graph that builds the categorized grocery list from the plan state."""
+    from plan_state import PlanState
+
+    return _single_node_agent(name, functools.partial(grocery_shopper_node, name=name), PlanState, "grocery_shopper")
+
+
+def new_meals(state):
+    """The optimized plan without the recycled meals, which are already in the graph."""
+    recycled = {meal["name"] for meal in state.get("selected_meals") or []}
+    return [meal for meal in state.get("optimized_meal_plan") or [] if meal["name"] not in recycled]
+
+
+def push_meal_plan(meal_plan):
+    """Validate the new meals of a plan and write them to the graph in one transaction, returning what was stored.
+
+    Callers pass only meals that are not in the graph yet (see new_meals): re-pushing a recycled
+    meal would overwrite its stored instructions with the optimizer's rewrite and add CONTAINS
+    edges for every substituted ingredient. The Neo4j error propagates, so a checkpointed plan stops here and can be resumed; the write
+    MERGEs on names, so pushing the same plan again is harmless.
+    """
+    meals = [meal.model_dump() for meal in valid_meals(meal_plan)]
+    if not meals:
+        return PushResult(pushed_meals=[])
+    return PushResult(pushed_meals=create_meal_graph(meals))
+
+
+def meal_pusher_node(state, name="meal_pusher"):
+    """Store the plan state's new meals. Shared by both planning modes."""
+    from plan_state import pushed_summary
+
+    result = push_meal_plan(new_meals(state))
+    return {"messages": [pushed_summary(name, result.pushed_meals)]}
+
+
+def build_meal_pusher(name="meal_pusher"):
+    """Compile a single-node graph that stores the plan's new meals from the plan state."""
+    from plan_state import PlanState
+
+    return _single_node_agent(name, functools.partial(meal_pusher_node, name=name), PlanState, "meal_pusher")
+
+
+
+# Agents are built on first use and cached, so importing this module makes no
+# model clients, database connections or graphs.
+
+@functools.lru_cache(maxsize=None)
+def get_meal_checker():
+    """Meal Checker: deterministic rotation lookup, no LLM involved."""
+    return build_meal_checker()
+
+
+@functools.lru_cache(maxsize=None)
+def get_personal_chef():
+    """Personal Chef: cached recipe search plus one structured MealPlan call."""
+    return build_personal_chef()
+
+
+@functools.lru_cache(maxsize=None)
+def get_meal_pusher():
+    """Meal Pusher: validated batch write of the optimized plan, no LLM involved."""
+    return build_meal_pusher()
+
+
+@functools.lru_cache(maxsize=None)
+def get_menu_optimizer():
+    """Menu Optimizer: local ingredient consolidation against the swap table, no LLM involved."""
+    return build_menu_optimizer()
+
+
+@functools.lru_cache(maxsize=None)
+def get_grocery_shopper():
+    """Grocery Shopper: local normalize/dedupe/categorize, no LLM involved."""
+    return build_grocery_shopper()
+
+
+_AGENT_FACTORIES = {
+    "meal_checker": get_meal_checker,
+    "personal_chef": get_personal_chef,
+    "meal_pusher": get_meal_pusher,
+    "menu_optimizer": get_menu_optimizer,
+    "grocery_shopper": get_grocery_shopper,
+}
 
 
+def __getattr__(name):
+    # Keep `from agents import personal_chef` working without building agents at import time
+    if name in _AGENT_FACTORIES:
+        return _AGENT_FACTORIES[name]()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
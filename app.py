@@ -1,41 +1,47 @@
 import streamlit as st
-import time
 import re
-from neo4j import GraphDatabase
-from supervisors import top_level_supervisor
+import uuid
+from datetime import date
+from meal_repository import get_repository, graph_version
+from grocery import build_grocery_list
+from plan_jobs import get_job_manager
+from metrics import start_metrics_server
+from settings import config_section
+from tools import rotation_settings
 import os
 
-# Neo4j Connection Class
+# Rendered meals are shared by all sessions until a write bumps the graph version;
+# the TTL only matters for writes made by other processes (e.g. bulk_import.py)
+MEAL_CACHE_TTL = config_section("meal_cache", {"ttl_seconds": 300})["ttl_seconds"]
+
+# Neo4j Query Class (backed by the shared, pooled driver)
 class MealQuery:
-    def __init__(self, uri, password):
-        self.driver = GraphDatabase.driver(uri, auth=("neo4j", password))
-
-    def close(self):
-        self.driver.close()
-
-    def get_meals_with_ingredients_and_protein_tags(self):
-        """Fetch meals and their ingredients with protein tags from Neo4j, excluding those shown in the last week"""
-        query = """
-        MATCH (m:Meal)
-        WHERE m.last_shown IS NULL OR date(m.last_shown) < date() - duration({weeks: 1})
-        OPTIONAL MATCH (m)-[:CONTAINS]->(ing:Ingredient)
-        RETURN m.name AS meal,
-               m.description AS instructions,
-               COLLECT(ing.name + ' (' + CASE WHEN ing:Protein THEN 'Protein' ELSE 'Non-Protein' END + ')') AS ingredients
-        LIMIT 7
-        """
-        with self.driver.session() as session:
-            result = session.run(query)
-            return [record.data() for record in result]  # Convert Neo4j records to dict
+    def __init__(self, repository=None, user_id=None):
+        self._repository = repository
+        self.user_id = user_id or rotation_settings()["user_id"]
+
+    @property
+    def repository(self):
+        # Resolved on first query so importing the app does not touch the database
+        return self._repository or get_repository()
+
+    def get_meals_with_ingredients_and_protein_tags(self, user_id=None):
+        """Fetch meals and their ingredients with protein tags from Neo4j, excluding those shown to this household in the last week"""
+        return self.repository.get_meals_with_ingredients_and_protein_tags(user_id or self.user_id)
 
 # Initialize Neo4j connection
-neo4j_conn = MealQuery("bolt://localhost:7687", "Pratikps1$")
+neo4j_conn = MealQuery()
 
 def fetch_meals():
-    """Retrieve meal data from the database"""
-    meals_data = neo4j_conn.get_meals_with_ingredients_and_protein_tags()
+    """Retrieve meal data along with the categorized grocery list, from memory unless the graph has changed"""
+    return render_meals(neo4j_conn.user_id, graph_version(), date.today().isoformat())
+
+@st.cache_data(ttl=MEAL_CACHE_TTL, max_entries=1000, show_spinner=False)
+def render_meals(user_id, version, day):
+    """Query Neo4j and render the meals for one graph version (the day is part of the key because the "last week" window moves)"""
+    meals_data = neo4j_conn.get_meals_with_ingredients_and_protein_tags(user_id)
     if not meals_data:
-        return ["No meals found. Please generate a new meal plan."], []
+        return ["No meals found. Please generate a new meal plan."], {}
 
     meal_texts = []
     all_ingredients = []
@@ -62,21 +68,21 @@ def fetch_meals():
 
         meal_texts.append((meal_name, meal_info, ingredients_info))
 
-    return meal_texts, all_ingredients
+    return meal_texts, build_grocery_list(all_ingredients)
 
 def generate_new_meal():
-    """Generate a new meal plan and refresh the page"""
-    # **Set flag for UI Lock & Display Loading Message**
-    st.session_state["loading"] = True
-    st.rerun()  # **Trigger Immediate Page Refresh**
+    """Start generating a new meal plan in the background for this session"""
+    get_job_manager().submit(st.session_state["session_id"], neo4j_conn.user_id)
 
-def create_txt_file(ingredients):
-    """Create a TXT file for the grocery list with UTF-8 encoding"""
+def create_txt_file(grocery_list):
+    """Create a TXT file for the categorized grocery list with UTF-8 encoding"""
     txt_path = "grocery_list.txt"
     with open(txt_path, "w", encoding="utf-8") as f:  # Force UTF-8 encoding
-        f.write("Grocery List:\n\n")  # Removed emoji to prevent encoding issues
-        for item in ingredients:
-            f.write(f"- {item}\n")
+        f.write("Grocery List:\n")  # Removed emoji to prevent encoding issues
+        for category, items in grocery_list.items():
+            f.write(f"\n{category}:\n")
+            for item in items:
+                f.write(f"- {item}\n")
     return txt_path
 
 def download_grocery_list_as_txt(ingredients):
@@ -94,42 +100,34 @@ def download_grocery_list_as_txt(ingredients):
     else:
         st.error("Please generate a meal plan first.")
 
-def main():
-    # **Check if meals should be generated**
-    if "loading" in st.session_state and st.session_state["loading"]:
-        st.markdown(
-            """
-            <style>
-            .overlay {
-                position: fixed;
-                top: 0;
-                left: 0;
-                width: 100%;
-                height: 100%;
-                background-color: rgba(128, 128, 128, 0.5);
-                z-index: 9999;
-                text-align: center;
-                color: white;
-                font-size: 24px;
-                padding-top: 20%;
-            }
-            </style>
-            <div class='overlay'>🔄 Cooking up a fresh meal plan... Please wait!</div>
-            """, 
-            unsafe_allow_html=True
-        )
-
-        # **Simulating processing time**
-        time.sleep(2)  
-        top_level_supervisor.invoke({
-            "messages": [{"role": "user", "content": "Plan a balanced vegetarian meal for the week."}]
-        })
-        time.sleep(2)  
-
-        # **Update Meals in Session State**
+@st.fragment(run_every=1)
+def show_plan_progress():
+    """Poll the session's background plan and stream its progress into the page"""
+    job = get_job_manager().get(st.session_state["session_id"])
+    if job is None:
+        return
+
+    progress = job.snapshot()
+    if not job.done:
+        st.info(f"🔄 Cooking up a fresh meal plan... ({progress['elapsed']:.0f}s)")
+        if progress["stage"]:
+            st.caption(f"Now running: {progress['stage']}")
+        if progress["meals"]:
+            st.markdown("**Meals so far:** " + ", ".join(progress["meals"]))
+    elif progress["status"] == "failed":
+        st.error(f"Meal plan generation failed: {progress['error']}")
+    elif st.session_state.get("loaded_job") != progress["id"]:
+        # **Update Meals in Session State** once, then refresh the whole page
+        st.session_state["loaded_job"] = progress["id"]
         st.session_state["meals"], st.session_state["ingredients"] = fetch_meals()
-        st.session_state["loading"] = False  # **Reset loading state**
-        st.rerun()  # **Force full page refresh**
+        st.rerun(scope="app")
+
+def main():
+    # Prometheus endpoint shared by all sessions ("metrics.port" in config.json)
+    start_metrics_server()
+
+    if "session_id" not in st.session_state:
+        st.session_state["session_id"] = uuid.uuid4().hex
 
     # Personalized Greeting
     st.markdown("# 🍽️ Welcome to Your Personalized Meal Planner, Pratik! 🚀")
@@ -154,7 +152,9 @@ def main():
         st.markdown("## 🛒 **Grocery List**")
         with st.expander("📌 View Grocery List"):
             st.markdown("### ✅ **Your Ingredients:**")
-            st.markdown("\n".join([f"- {item}" for item in ingredients]))  # Proper Bullet Points
+            for category, items in ingredients.items():
+                st.markdown(f"#### {category}")
+                st.markdown("\n".join([f"- {item}" for item in items]))  # Proper Bullet Points
         
         # Download Button for Grocery List
         download_grocery_list_as_txt(ingredients)  
@@ -163,9 +163,12 @@ def main():
     st.markdown("---")  # Adds a divider
     st.markdown("### 🤔 In the Mood for Something Else?")
     st.markdown("Click below and let me generate new sets of meals for you! 🍽️")
-    
-    if st.button("🔄 Generate New Meal Plan"):
+
+    job = get_job_manager().get(st.session_state["session_id"])
+    if st.button("🔄 Generate New Meal Plan", disabled=job is not None and not job.done):
         generate_new_meal()
 
+    show_plan_progress()
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,146 @@
+import argparse
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from checkpoints import run_plan
+from metrics import start_metrics_server, track_run
+from rate_limits import limiter_stats
+
+
+DEFAULT_PROMPT = "Plan a balanced vegetarian meal for the week."
+
+
+def read_requests(path):
+    """Yield plan requests from a JSONL file; each line needs a user_id and may set an id and a prompt."""
+    with open(path, encoding="utf-8") as f:
+        for line_number, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                request = json.loads(line)
+            except json.JSONDecodeError as e:
+                print(f"Skipping line {line_number}: {e}")
+                continue
+            if not request.get("user_id"):
+                print(f"Skipping line {line_number}: missing user_id")
+                continue
+            request.setdefault("id", request["user_id"])
+            request.setdefault("prompt", DEFAULT_PROMPT)
+            yield request
+
+
+def completed_ids(output_path):
+    """Return the ids a previous run already planned successfully, so a rerun resumes where it stopped."""
+    if not os.path.exists(output_path):
+        return set()
+    done = set()
+    with open(output_path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # A line cut short by an interrupted run
+                continue
+            if record.get("status") == "ok":
+                done.add(record["id"])
+    return done
+
+
+class ResultWriter:
+    """Appends one JSON line per finished plan and flushes it, so the output file doubles as the checkpoint."""
+
+    def __init__(self, path):
+        self._file = open(path, "a", encoding="utf-8")
+        self._lock = threading.Lock()
+
+    def write(self, record):
+        with self._lock:
+            self._file.write(json.dumps(record) + "\n")
+            self._file.flush()
+            os.fsync(self._file.fileno())
+
+    def close(self):
+        self._file.close()
+
+
+def plan_one(planner, request):
+    """Run the planning graph for one household and return its output record."""
+    started = time.perf_counter()
+    record = {"id": request["id"], "user_id": request["user_id"]}
+    with track_run(request["id"]) as run:
+        try:
+            # A request that failed in an earlier batch run resumes at the stage that failed
+            result = run_plan(planner, {
+                "messages": [{"role": "user", "content": request["prompt"]}],
+                "user_id": request["user_id"],
+            }, f"batch-{request['id']}", config=run.config())
+            meal_plan = result.get("optimized_meal_plan", [])
+            record.update({
+                "status": "ok",
+                "meals": [meal["name"] for meal in meal_plan],
+                "meal_plan": meal_plan,
+                "grocery_list": result.get("grocery_list", {}),
+            })
+        except Exception as e:
+            # Provider errors were already retried inside the model and search calls
+            record.update({"status": "error", "error": f"{e.__class__.__name__}: {e}"})
+    record["seconds"] = round(time.perf_counter() - started, 2)
+    record["metrics"] = run.report()
+    return record
+
+
+def run_batch(requests_path, output_path, workers=4, planner=None):
+    """Plan every pending request on a worker pool and append the results to output_path."""
+    if planner is None:
+        from pipeline import get_planner
+        planner = get_planner()
+
+    done = completed_ids(output_path)
+    pending = [request for request in read_requests(requests_path) if request["id"] not in done]
+    print(f"{len(done)} plans already done, {len(pending)} to go with {workers} workers")
+
+    writer = ResultWriter(output_path)
+    counts = {"ok": 0, "error": 0}
+    started = time.perf_counter()
+    try:
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="batch-plan") as executor:
+            futures = [executor.submit(plan_one, planner, request) for request in pending]
+            for finished, future in enumerate(as_completed(futures), start=1):
+                record = future.result()
+                writer.write(record)
+                counts[record["status"]] += 1
+                print(
+                    f"[{finished}/{len(pending)}] {record['id']}: {record['status']} in {record['seconds']}s "
+                    f"(${record['metrics']['totals']['cost']:.4f})"
+                )
+    finally:
+        writer.close()
+
+    elapsed = max(time.perf_counter() - started, 1e-9)
+    print(
+        f"Done: {counts['ok']} ok, {counts['error']} failed in {elapsed:.1f}s "
+        f"({counts['ok'] * 60 / elapsed:.1f} plans/min)"
+    )
+    for provider, stats in limiter_stats().items():
+        print(f"{provider}: {stats['calls']} calls, {stats['tokens']} tokens, {stats['waited_seconds']}s waiting for quota")
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate weekly plans for many households from a JSONL request file.")
+    parser.add_argument("requests", help="JSONL file with one request per line (user_id, optional id and prompt)")
+    parser.add_argument("output", help="JSONL results file; rerunning with the same file skips finished plans")
+    parser.add_argument("--workers", type=int, default=4, help="Plans run at once (API calls are further capped per provider)")
+    parser.add_argument("--metrics-port", type=int, help="Serve Prometheus metrics on this port while the batch runs")
+    args = parser.parse_args()
+    if args.metrics_port is not None:
+        print(f"Metrics at http://localhost:{start_metrics_server(args.metrics_port)}/metrics")
+    counts = run_batch(args.requests, args.output, workers=args.workers)
+    raise SystemExit(1 if counts["error"] else 0)
+
+
+if __name__ == "__main__":
+    main()
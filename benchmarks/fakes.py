@@ -0,0 +1,288 @@
+# Offline stand-ins for the benchmark harness: a scripted chat model that plays every
+# agent and supervisor with deterministic tool calls, canned search results, and an
+# in-memory MealRepository that mirrors the Neo4j queries' access patterns.
+import itertools
+import json
+import re
+import threading
+import time
+from collections import defaultdict
+from datetime import date, timedelta
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.utils.function_calling import convert_to_openai_tool
+from ingredients import canonical_ingredient
+from meal_selection import IngredientCatalog, select_meals, selection_settings
+
+
+MAIN_INGREDIENTS = [
+    "spinach", "brown rice", "quinoa", "bell peppers", "broccoli", "sweet potatoes",
+    "zucchini", "carrots", "kale", "tomatoes", "onions", "cauliflower", "mushrooms",
+]
+PROTEINS = ["tofu", "chickpeas", "red lentils", "paneer", "tempeh", "black beans", "greek yogurt"]
+COOKING_METHODS = ["stir-fry", "bake", "simmer", "roast", "grill"]
+
+SEARCH_RESULTS = [
+    {"url": "https://example.com/curry", "content": "Chickpea and spinach curry with brown rice"},
+    {"url": "https://example.com/stir-fry", "content": "Tofu and broccoli stir fry with quinoa"},
+    {"url": "https://example.com/tacos", "content": "Black bean and sweet potato tacos"},
+    {"url": "https://example.com/dal", "content": "Red lentil dal with cauliflower and tomatoes"},
+]
+
+
+def synthetic_meal(index):
+    """A deterministic, unique meal in the agents' meal_plan format."""
+    return {
+        "name": f"Benchmark Meal {index}",
+        "main_ingredients": [MAIN_INGREDIENTS[(index + offset) % len(MAIN_INGREDIENTS)] for offset in (0, 3, 7)],
+        "protein_source": [PROTEINS[index % len(PROTEINS)]],
+        "cooking_method": COOKING_METHODS[index % len(COOKING_METHODS)],
+        "instructions": f"1. Prep the vegetables. 2. Cook the {PROTEINS[index % len(PROTEINS)]}. 3. Combine and serve.",
+    }
+
+
+class CallCounter:
+    """Thread-safe count of scripted model calls, per role."""
+
+    def __init__(self):
+        self.calls = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def add(self, role):
+        with self._lock:
+            self.calls[role] += 1
+
+    def reset(self):
+        with self._lock:
+            self.calls.clear()
+
+    def total(self):
+        with self._lock:
+            return sum(self.calls.values())
+
+
+MODEL_CALLS = CallCounter()
+# Generated meals are numbered above any seeded catalog so names never collide
+_generated_meals = itertools.count(1_000_000)
+_call_ids = itertools.count()
+
+
+class ScriptedChatModel(BaseChatModel):
+    """Plays one agent or supervisor (`role`) deterministically.
+
+    Supervisors hand off to each of their agents once, in the order their prompt names them,
+    then answer. personal_chef returns the requested number of new meals through its MealPlan
+    tool. `latency` is slept per call to stand in for the network round trip.
+    """
+
+    role: str
+    latency: float = 0.0
+    tool_names: list = []
+
+    @property
+    def _llm_type(self):
+        return "scripted"
+
+    def _get_ls_params(self, stop=None, **kwargs):
+        return {"ls_provider": "scripted", "ls_model_name": f"scripted-{self.role}"}
+
+    def bind_tools(self, tools, parallel_tool_calls=False, **kwargs):
+        names = [convert_to_openai_tool(tool)["function"]["name"] for tool in tools]
+        return self.model_copy(update={"tool_names": names})
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        MODEL_CALLS.add(self.role)
+        if self.latency:
+            time.sleep(self.latency)
+        message = self._respond(messages)
+        text = message.content + json.dumps(message.tool_calls)
+        prompt = sum(len(str(m.content)) for m in messages)
+        message.usage_metadata = {
+            "input_tokens": prompt // 4, "output_tokens": len(text) // 4, "total_tokens": (prompt + len(text)) // 4,
+        }
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _tool_call(self, name, args):
+        return AIMessage(content="", tool_calls=[{"name": name, "args": args, "id": f"call_{next(_call_ids)}"}])
+
+    def _respond(self, messages):
+        handoffs = [name for name in self.tool_names if name.startswith("transfer_to_")]
+        if handoffs:
+            called = {
+                call["name"] for message in messages if isinstance(message, AIMessage) for call in message.tool_calls
+            }
+            # Hand off in the order the supervisor's prompt names its agents
+            prompt = " ".join(str(m.content) for m in messages if m.type == "system").lower()
+
+            def position(name):
+                agent = name[len("transfer_to_"):]
+                found = [i for i in (prompt.find(agent), prompt.find(agent.replace("_", " "))) if i >= 0]
+                return min(found) if found else len(prompt)
+
+            for name in sorted(handoffs, key=position):
+                if name not in called:
+                    return self._tool_call(name, {})
+            return AIMessage(content="All steps are done.")
+
+        if self.role == "personal_chef" and "MealPlan" in self.tool_names:
+            request = next((m.content for m in reversed(messages) if m.type == "human"), "")
+            match = re.search(r"Generate (\d+)", request)
+            count = int(match.group(1)) if match else 2
+            return self._tool_call("MealPlan", {"meal_plan": [synthetic_meal(next(_generated_meals)) for _ in range(count)]})
+        return AIMessage(content="{}")
+
+
+def scripted_chat_model(latency=0.0):
+    """Drop-in replacement for agents.chat_model(model_name, agent_name)."""
+    def chat_model(model_name, agent_name):
+        return ScriptedChatModel(role=agent_name, latency=latency)
+    return chat_model
+
+
+class InMemoryMealRepository:
+    """MealRepository stand-in with the same methods and the same access patterns as the Cypher.
+
+    Rotation skips the household's own history while scanning the catalog in insertion order
+    and stops at the pool size, then falls back to its oldest SHOWN entries, as the indexed
+    queries do, and picks from that pool with the same in-memory bitset selection.
+    """
+
+    def __init__(self):
+        self.meals = {}
+        self.ingredients = defaultdict(set)
+        self.proteins = set()
+        self.shown = defaultdict(dict)
+        # (user_id, plan_id) -> picks, standing in for the plan property on SHOWN
+        self.plans = {}
+        # Word -> meal names, standing in for the meal_name_fulltext index
+        self.name_words = defaultdict(set)
+        self.writes = 0
+        # Reentrant: a catalog refresh during rotation reads the meals under the same lock
+        self._lock = threading.RLock()
+        self.catalog = IngredientCatalog(self.load_meal_ingredients)
+
+    def seed(self, count, start=0):
+        """Add `count` synthetic meals directly, bypassing the write path."""
+        for index in range(start, start + count):
+            meal = synthetic_meal(index)
+            self.meals[meal["name"]] = {"instructions": meal["instructions"]}
+            self._index_name(meal["name"])
+            self.ingredients[meal["name"]] = set(meal["main_ingredients"] + meal["protein_source"])
+            self.proteins.update(meal["protein_source"])
+        return self
+
+    def _index_name(self, name):
+        for word in re.findall(r"[a-z0-9]+", name.lower()):
+            self.name_words[word].add(name)
+
+    def search_meal_names(self, queries, limit=5):
+        with self._lock:
+            hits = {}
+            for entry in queries:
+                words = [word.rstrip("~1") for word in entry["query"].split(" OR ") if word]
+                scores = defaultdict(int)
+                for word in words:
+                    for name in self.name_words.get(word, ()):
+                        scores[name] += 1
+                best = sorted(scores, key=lambda name: (-scores[name], name))[:limit]
+                if best:
+                    hits[entry["name"]] = best
+            return hits
+
+    def load_meal_ingredients(self):
+        with self._lock:
+            return [
+                (name, sorted(self.ingredients[name]), sorted(self.ingredients[name] & self.proteins))
+                for name in self.meals
+            ]
+
+    def get_and_mark_old_meals(self, user_id, count=4, weeks=2, plan_id=None):
+        pool_size = max(selection_settings()["pool_size"], count)
+        self.catalog.masks([])
+        with self._lock:
+            if plan_id is not None and (user_id, plan_id) in self.plans:
+                picked = self.plans[user_id, plan_id]
+                return [{"name": name, "instructions": self.meals[name]["instructions"]} for name in picked]
+            history = self.shown[user_id]
+            pool = []
+            for name in self.meals:
+                if len(pool) == pool_size:
+                    break
+                if name not in history:
+                    pool.append(name)
+            if len(pool) < pool_size:
+                cutoff = date.today() - timedelta(weeks=weeks)
+                stale = sorted((shown, name) for name, shown in history.items() if shown < cutoff)
+                pool += [name for _, name in stale[:pool_size - len(pool)]]
+            picked = select_meals(pool, count, self.catalog)
+            if plan_id is not None:
+                self.plans[user_id, plan_id] = picked
+            for name in picked:
+                history[name] = date.today()
+            return [{"name": name, "instructions": self.meals[name]["instructions"]} for name in picked]
+
+    def write_meal_plan(self, meal_rows):
+        with self._lock:
+            self.writes += 1
+            for row in meal_rows:
+                self.meals.setdefault(row["name"], {})["instructions"] = row["instructions"]
+                self._index_name(row["name"])
+                self.ingredients[row["name"]].update(row["ingredients"])
+                self.proteins.update(row["protein_sources"])
+        self.catalog.add_meals(meal_rows)
+
+    def get_meal_ingredients(self, meal_names):
+        with self._lock:
+            return {
+                name: {
+                    "main_ingredients": sorted(self.ingredients[name] - self.proteins),
+                    "protein_source": sorted(self.ingredients[name] & self.proteins),
+                }
+                for name in meal_names if name in self.meals
+            }
+
+    def get_protein_names(self, ingredient_names):
+        with self._lock:
+            # Seeded names are raw ("black beans"); the real graph stores canonical ones
+            proteins = {canonical_ingredient(name) for name in self.proteins}
+        return [name for name in ingredient_names if canonical_ingredient(name) in proteins]
+
+    def get_meals_with_ingredients_and_protein_tags(self, user_id):
+        with self._lock:
+            cutoff = date.today() - timedelta(weeks=1)
+            recent = {name for name, shown in self.shown[user_id].items() if shown >= cutoff}
+            names = list(itertools.islice((name for name in self.meals if name not in recent), 7))
+            return [
+                {
+                    "meal": name,
+                    "instructions": self.meals[name]["instructions"],
+                    "ingredients": [
+                        f"{ingredient} ({'Protein' if ingredient in self.proteins else 'Non-Protein'})"
+                        for ingredient in sorted(self.ingredients[name])
+                    ],
+                }
+                for name in names
+            ]
+
+
+def install_fakes(catalog_size=1000, latency=0.0):
+    """Point the app's model factory, search, repository and checkpointer at the offline stand-ins."""
+    import sqlite3
+    import agents
+    import checkpoints
+    import meal_repository
+    import search_cache
+    import supervisors
+    from ttl_store import TTLStore
+
+    repository = InMemoryMealRepository().seed(catalog_size)
+    meal_repository._repository = repository
+    search_cache._search = search_cache.CachedSearch(
+        search_cache.StaticSearchBackend(SEARCH_RESULTS), TTLStore(":memory:", "search_cache")
+    )
+    # Same SQLite saver as the app, but in memory, so runs leave no checkpoint file behind
+    from langgraph.checkpoint.sqlite import SqliteSaver
+    checkpoints._checkpointer = SqliteSaver(sqlite3.connect(":memory:", check_same_thread=False))
+    agents.chat_model = supervisors.chat_model = scripted_chat_model(latency)
+    return repository
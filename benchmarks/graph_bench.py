@@ -0,0 +1,92 @@
+# Write and rotation throughput of tools.py against the in-memory graph stand-in, at
+# catalog sizes from 100 to 100k meals. The stand-in mirrors the access patterns of the
+# Cypher queries (rotation cost follows the household's history, not the catalog), so a
+# rotation rate that falls as the catalog grows points at a regression in that shape.
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from fakes import InMemoryMealRepository, synthetic_meal  # noqa: E402
+
+
+def measure(catalog_size, batch_size, households, rounds):
+    """Load a catalog through create_meal_graph, then run rotation lookups for many households."""
+    import meal_repository
+    import tools
+
+    repository = InMemoryMealRepository()
+    meal_repository._repository = repository
+
+    meals = [synthetic_meal(index) for index in range(catalog_size)]
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        for start in range(0, catalog_size, batch_size):
+            tools.create_meal_graph(meals[start:start + batch_size])
+    write_seconds = time.perf_counter() - started
+
+    # The rotation's bitset catalog loads once per process (and per refresh), not per lookup
+    started = time.perf_counter()
+    repository.catalog.masks([])
+    catalog_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    lookups = 0
+    for round_number in range(rounds):
+        for household in range(households):
+            tools.get_and_update_old_meals(user_id=f"household-{household}")
+            lookups += 1
+    rotation_seconds = time.perf_counter() - started
+
+    return {
+        "catalog_size": catalog_size,
+        "meals_written_per_second": round(catalog_size / max(write_seconds, 1e-9)),
+        "rotations_per_second": round(lookups / max(rotation_seconds, 1e-9)),
+        "write_seconds": round(write_seconds, 4),
+        "catalog_load_seconds": round(catalog_seconds, 4),
+        "rotation_seconds": round(rotation_seconds, 4),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure create_meal_graph and rotation throughput without Neo4j.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1_000, 10_000, 100_000])
+    parser.add_argument("--batch-size", type=int, default=500, help="Meals per create_meal_graph call")
+    parser.add_argument("--households", type=int, default=200)
+    parser.add_argument("--rounds", type=int, default=5, help="Rotation lookups per household")
+    parser.add_argument(
+        "--max-slowdown", type=float,
+        help="Fail if rotations/s at the largest catalog is more than this factor below the smallest"
+    )
+    parser.add_argument("--json", action="store_true", help="Print the results as JSON")
+    args = parser.parse_args()
+
+    # rotation settings are read from config.json relative to the repo root
+    os.chdir(ROOT)
+    results = [measure(size, args.batch_size, args.households, args.rounds) for size in args.sizes]
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        for result in results:
+            print(
+                f"{result['catalog_size']:>8} meals  "
+                f"create_meal_graph {result['meals_written_per_second']:>9}/s  "
+                f"rotation {result['rotations_per_second']:>7}/s  "
+                f"catalog load {result['catalog_load_seconds'] * 1000:8.1f} ms"
+            )
+
+    if args.max_slowdown is not None and len(results) > 1:
+        slowdown = results[0]["rotations_per_second"] / max(results[-1]["rotations_per_second"], 1)
+        if slowdown > args.max_slowdown:
+            print(f"FAIL: rotation is {slowdown:.1f}x slower at {results[-1]['catalog_size']} meals (budget {args.max_slowdown}x)")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+# End-to-end plan benchmark, fully offline: every agent and supervisor is played by a
+# scripted chat model, search answers from canned results and the graph is an in-memory
+# stand-in. Reports plan latency and model calls per plan for each planning mode, and
+# fails when a plan needs more model calls or time than the given budgets.
+import argparse
+import contextlib
+import io
+import json
+import os
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from fakes import MODEL_CALLS, install_fakes  # noqa: E402
+
+
+PLAN_REQUEST = "Plan a balanced vegetarian meal for the week."
+
+
+def build_planner(mode):
+    if mode == "supervisor":
+        from supervisors import get_top_level_supervisor
+        return get_top_level_supervisor()
+    from pipeline import get_meal_plan_pipeline
+    return get_meal_plan_pipeline()
+
+
+def run_plans(mode, plans, households):
+    """Run `plans` plans in one mode and return per-plan latency, model calls and stage timings."""
+    from checkpoints import run_plan
+    from metrics import track_run
+
+    planner = build_planner(mode)
+    results = []
+    for index in range(plans):
+        MODEL_CALLS.reset()
+        started = time.perf_counter()
+        # Tool output (e.g. "Meals successfully pushed") would drown the report
+        with contextlib.redirect_stdout(io.StringIO()), track_run(f"{mode}-{index}") as run:
+            run_plan(
+                planner,
+                {"messages": [{"role": "user", "content": PLAN_REQUEST}], "user_id": f"household-{index % households}"},
+                f"bench-{mode}-{index}-{time.time_ns()}",
+                config=run.config(),
+            )
+        results.append({
+            "seconds": time.perf_counter() - started,
+            "model_calls": MODEL_CALLS.total(),
+            "calls_by_role": dict(MODEL_CALLS.calls),
+            "stages": run.report()["stages"],
+        })
+    return results
+
+
+def summarize(mode, results):
+    latencies = sorted(result["seconds"] for result in results)
+    calls = [result["model_calls"] for result in results]
+    return {
+        "mode": mode,
+        "plans": len(results),
+        "p50_seconds": round(statistics.median(latencies), 4),
+        "max_seconds": round(latencies[-1], 4),
+        "model_calls_per_plan": round(statistics.mean(calls), 2),
+        "calls_by_role": results[-1]["calls_by_role"],
+        "slowest_stages": [(stage["stage"], stage["seconds"]) for stage in results[-1]["stages"][:5]],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure plan latency and model calls per plan without network access.")
+    parser.add_argument("--modes", nargs="+", default=["pipeline", "supervisor"], choices=["pipeline", "supervisor"])
+    parser.add_argument("--plans", type=int, default=5, help="Plans per mode")
+    parser.add_argument("--households", type=int, default=5, help="Distinct user_ids the plans rotate through")
+    parser.add_argument("--catalog-size", type=int, default=1000, help="Meals in the in-memory graph")
+    parser.add_argument("--model-latency", type=float, default=0.05, help="Seconds slept per scripted model call")
+    parser.add_argument("--max-model-calls", type=float, help="Fail if a mode averages more model calls per plan")
+    parser.add_argument("--max-seconds", type=float, help="Fail if a mode's median plan takes longer")
+    parser.add_argument("--json", action="store_true", help="Print the summary as JSON")
+    args = parser.parse_args()
+
+    # config.json (plan size, rotation, generation settings) is read relative to the repo root
+    os.chdir(ROOT)
+    install_fakes(catalog_size=args.catalog_size, latency=args.model_latency)
+
+    summaries = [summarize(mode, run_plans(mode, args.plans, args.households)) for mode in args.modes]
+    if args.json:
+        print(json.dumps(summaries, indent=2))
+    else:
+        for summary in summaries:
+            print(
+                f"{summary['mode']:10} p50 {summary['p50_seconds'] * 1000:8.1f} ms  max {summary['max_seconds'] * 1000:8.1f} ms  "
+                f"{summary['model_calls_per_plan']:5.1f} model calls/plan"
+            )
+            print(f"{'':10} calls by role: {summary['calls_by_role']}")
+            print(f"{'':10} slowest stages: {summary['slowest_stages']}")
+
+    failures = []
+    for summary in summaries:
+        if args.max_model_calls is not None and summary["model_calls_per_plan"] > args.max_model_calls:
+            failures.append(f"{summary['mode']}: {summary['model_calls_per_plan']} model calls/plan (budget {args.max_model_calls})")
+        if args.max_seconds is not None and summary["p50_seconds"] > args.max_seconds:
+            failures.append(f"{summary['mode']}: p50 {summary['p50_seconds']:.3f}s (budget {args.max_seconds:.3f}s)")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
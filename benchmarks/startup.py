@@ -0,0 +1,61 @@
+# Import-time budget check: importing the app's modules must be fast and side-effect free.
+# Each module is imported in a fresh interpreter with stdin closed (so a stray getpass
+# fails loudly) and no API keys in the environment. Fails if any import exceeds the
+# budget or leaves new files behind (e.g. cache databases).
+import argparse
+import os
+import subprocess
+import sys
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODULES = ["settings", "meal_repository", "tools", "agents", "supervisors", "pipeline"]
+
+_PROBE = "import time; t = time.perf_counter(); import {module}; print(time.perf_counter() - t)"
+
+
+def measure_import(module, repeat=3):
+    """Return the best-of-`repeat` import time of `module` in seconds, in a clean subprocess."""
+    env = {k: v for k, v in os.environ.items() if k not in ("TAVILY_API_KEY", "ANTHROPIC_API_KEY")}
+    timings = []
+    for _ in range(repeat):
+        completed = subprocess.run(
+            [sys.executable, "-W", "ignore", "-c", _PROBE.format(module=module)],
+            cwd=ROOT, env=env, stdin=subprocess.DEVNULL, capture_output=True, text=True, timeout=120
+        )
+        if completed.returncode != 0:
+            raise RuntimeError(f"importing {module} failed:\n{completed.stderr}")
+        timings.append(float(completed.stdout.strip().splitlines()[-1]))
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fail if importing the app's modules exceeds a time budget.")
+    parser.add_argument("--budget", type=float, default=1.5, help="Maximum import time per module, in seconds")
+    parser.add_argument("modules", nargs="*", default=MODULES)
+    args = parser.parse_args()
+
+    files_before = set(os.listdir(ROOT))
+    failures = []
+    for module in args.modules:
+        try:
+            elapsed = measure_import(module)
+        except RuntimeError as e:
+            failures.append(str(e))
+            continue
+        status = "ok" if elapsed <= args.budget else "OVER BUDGET"
+        print(f"{module:20} {elapsed * 1000:8.1f} ms  {status}")
+        if elapsed > args.budget:
+            failures.append(f"{module} took {elapsed:.2f}s (budget {args.budget:.2f}s)")
+
+    created = set(os.listdir(ROOT)) - files_before - {"__pycache__"}
+    if created:
+        failures.append(f"imports created files: {', '.join(sorted(created))}")
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
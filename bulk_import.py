@@ -0,0 +1,63 @@
+import argparse
+import json
+import time
+from meal_repository import build_meal_rows, get_repository
+
+
+def read_recipes(path):
+    """Yield recipe dicts from a JSONL file, skipping blank lines."""
+    with open(path, encoding="utf-8") as f:
+        for line_number, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError as e:
+                print(f"Skipping line {line_number}: {e}")
+
+
+def batched(items, batch_size):
+    """Group an iterable into lists of at most batch_size items."""
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def import_recipes(path, batch_size=500, repository=None):
+    """Load recipes from a JSONL file into Neo4j, one transaction per batch, and return the count imported."""
+    repository = repository or get_repository()
+    total = 0
+    started = time.perf_counter()
+    for batch in batched(read_recipes(path), batch_size):
+        batch_started = time.perf_counter()
+        repository.write_meal_plan(build_meal_rows(batch))
+        total += len(batch)
+
+        batch_elapsed = max(time.perf_counter() - batch_started, 1e-9)
+        elapsed = max(time.perf_counter() - started, 1e-9)
+        print(
+            f"Imported {total} recipes "
+            f"(batch: {len(batch) / batch_elapsed:.0f}/s, overall: {total / elapsed:.0f}/s)"
+        )
+
+    elapsed = time.perf_counter() - started
+    print(f"Done: {total} recipes in {elapsed:.2f}s")
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk import recipes from a JSONL file into the meal graph.")
+    parser.add_argument("path", help="JSONL file with one recipe per line (name, instructions, main_ingredients, protein_source)")
+    parser.add_argument("--batch-size", type=int, default=500, help="Recipes written per transaction")
+    args = parser.parse_args()
+    import_recipes(args.path, batch_size=args.batch_size)
+
+
+if __name__ == "__main__":
+    main()
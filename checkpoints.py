@@ -0,0 +1,127 @@
+import contextlib
+import sqlite3
+import threading
+import uuid
+from settings import config_section
+
+
+DEFAULT_SETTINGS = {"enabled": True, "path": ".plan_checkpoints.sqlite", "keep_finished": False}
+
+_checkpointer = None
+_checkpointer_lock = threading.Lock()
+
+
+def checkpoint_settings(path="config.json"):
+    return config_section("checkpoints", DEFAULT_SETTINGS, path)
+
+
+def get_checkpointer():
+    """Return the process-wide SQLite checkpointer, or None when checkpoints are disabled."""
+    global _checkpointer
+    settings = checkpoint_settings()
+    if not settings["enabled"]:
+        return None
+    if _checkpointer is None:
+        with _checkpointer_lock:
+            if _checkpointer is None:
+                from langgraph.checkpoint.sqlite import SqliteSaver
+
+                # The saver serializes access itself; plans run on several worker threads
+                connection = sqlite3.connect(settings["path"], check_same_thread=False)
+                # WAL without a sync per commit: a crash of this process loses nothing, only power loss can
+                connection.execute("PRAGMA journal_mode=WAL")
+                connection.execute("PRAGMA synchronous=NORMAL")
+                _checkpointer = SqliteSaver(connection)
+    return _checkpointer
+
+
+@contextlib.asynccontextmanager
+async def async_checkpointer():
+    """Open an AsyncSqliteSaver on the checkpoint file for the running event loop, or yield None when disabled.
+
+    The shared SqliteSaver has no async methods, so `ainvoke` callers checkpoint through this one instead.
+    """
+    settings = checkpoint_settings()
+    if not settings["enabled"]:
+        yield None
+        return
+    import aiosqlite
+    from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+
+    async with aiosqlite.connect(settings["path"]) as connection:
+        await connection.execute("PRAGMA journal_mode=WAL")
+        await connection.execute("PRAGMA synchronous=NORMAL")
+        yield AsyncSqliteSaver(connection)
+
+
+def new_thread_id():
+    return uuid.uuid4().hex
+
+
+def thread_config(thread_id, config=None):
+    """`config` with the plan's checkpoint thread set."""
+    config = dict(config or {})
+    config["configurable"] = dict(config.get("configurable") or {}, thread_id=thread_id)
+    return config
+
+
+def plan_id(config):
+    """The checkpoint thread of the running plan, used to make its Neo4j writes idempotent."""
+    return ((config or {}).get("configurable") or {}).get("thread_id")
+
+
+def plan_input(planner, request, config):
+    """What to invoke the planner with: None to resume a thread that stopped partway through, else the request.
+
+    A resumed plan skips every stage that already finished and reruns only the one that failed.
+    """
+    if planner.checkpointer is None:
+        return request
+    state = planner.get_state(config)
+    if state.next:
+        print(f"Resuming plan {plan_id(config)} at {', '.join(state.next)}")
+        return None
+    return request
+
+
+def finish_thread(planner, config):
+    """Drop a finished plan's checkpoints unless `checkpoints.keep_finished` is set."""
+    if planner.checkpointer is not None and not checkpoint_settings()["keep_finished"]:
+        planner.checkpointer.delete_thread(plan_id(config))
+
+
+def run_plan(planner, request, thread_id, config=None):
+    """Invoke the planner on a durable thread, resuming it if an earlier attempt failed."""
+    config = thread_config(thread_id, config)
+    result = planner.invoke(plan_input(planner, request, config), config=config)
+    finish_thread(planner, config)
+    return result
+
+
+
+async def aplan_input(planner, request, config):
+    """`plan_input` for async callers."""
+    if planner.checkpointer is None:
+        return request
+    state = await planner.aget_state(config)
+    if state.next:
+        print(f"Resuming plan {plan_id(config)} at {', '.join(state.next)}")
+        return None
+    return request
+
+
+async def afinish_thread(planner, config):
+    """`finish_thread` for async callers."""
+    if planner.checkpointer is not None and not checkpoint_settings()["keep_finished"]:
+        await planner.checkpointer.adelete_thread(plan_id(config))
+
+
+async def arun_plan(planner, request, thread_id, config=None):
+    """`run_plan` for async callers: the planner runs on an AsyncSqliteSaver over the same checkpoint file."""
+    config = thread_config(thread_id, config)
+    async with async_checkpointer() as checkpointer:
+        # A compiled graph keeps its checkpointer; the shared sync one would fail in ainvoke
+        planner = planner.copy(update={"checkpointer": checkpointer})
+        result = await planner.ainvoke(await aplan_input(planner, request, config), config=config)
+        await afinish_thread(planner, config)
+    return result
@@ -0,0 +1,96 @@
+import re
+import unicodedata
+from ingredients import singularize
+from settings import config_section
+
+
+DEFAULT_SETTINGS = {"similarity_threshold": 0.85, "candidates_per_name": 5}
+
+# Words that do not tell two dishes apart: "Chickpea & Spinach Curry" is "Spinach Chickpea Curry"
+_FILLER = {"a", "an", "and", "the", "with", "of", "in", "on", "style", "easy", "quick", "healthy", "vegetarian"}
+
+
+def duplicate_settings(path="config.json"):
+    """Score above which two names count as the same meal, and full-text hits fetched per candidate."""
+    return config_section("duplicates", DEFAULT_SETTINGS, path)
+
+
+def name_tokens(name):
+    """Lowercased, accent-free, singular words of a meal name, without filler words."""
+    text = unicodedata.normalize("NFKD", name).encode("ascii", "ignore").decode().lower()
+    return [singularize(word) for word in re.findall(r"[a-z0-9]+", text) if word not in _FILLER]
+
+
+def normalize_meal_name(name):
+    """Order-insensitive key: names with the same key are exact duplicates."""
+    return " ".join(sorted(set(name_tokens(name))))
+
+
+def _one_edit_apart(a, b):
+    """True when one insertion, deletion, substitution or swap of neighbours turns `a` into `b`."""
+    if len(a) > len(b):
+        a, b = b, a
+    if len(b) - len(a) > 1:
+        return False
+    start = next((i for i, (x, y) in enumerate(zip(a, b)) if x != y), len(a))
+    if len(a) < len(b):
+        return a[start:] == b[start + 1:]
+    if a[start + 1:] == b[start + 1:]:
+        return True
+    return (a[start], a[start + 1]) == (b[start + 1], b[start]) and a[start + 2:] == b[start + 2:]
+
+
+def _same_word(a, b):
+    # Typos in longer words ("zucchini"/"zuchini", "lasagna"/"lasagne"), but not "greek"/"green" or "1" vs "2"
+    if a == b:
+        return True
+    if not (a.isalpha() and b.isalpha()) or min(len(a), len(b)) < 6:
+        return False
+    return _one_edit_apart(a, b)
+
+
+def name_similarity(a, b):
+    """0..1 similarity of two normalized keys: the share of words the names have in common."""
+    if a == b:
+        return 1.0
+    words_a, words_b = a.split(), b.split()
+    if not words_a or not words_b:
+        return 0.0
+    # Counted from both sides, so one word that fuzzily matches several cannot push the score past 1
+    shared_a = sum(1 for word in words_a if any(_same_word(word, other) for other in words_b))
+    shared_b = sum(1 for word in words_b if any(_same_word(word, other) for other in words_a))
+    return (shared_a + shared_b) / (len(words_a) + len(words_b))
+
+
+def fulltext_query(name):
+    """Lucene query for the meal_name_fulltext index: any of the name's words, fuzzy for longer words."""
+    words = re.findall(r"[a-z0-9]+", unicodedata.normalize("NFKD", name).encode("ascii", "ignore").decode().lower())
+    words = [word for word in dict.fromkeys(words) if word not in _FILLER]
+    return " OR ".join(f"{word}~1" if len(word) >= 5 else word for word in words)
+
+
+def classify_matches(candidates, catalog_hits, threshold=None):
+    """Decide which candidate names repeat a catalog meal or an earlier candidate.
+
+    `catalog_hits` maps each candidate to the catalog names the full-text index returned for it.
+    Returns {candidate: {"exact": [...], "similar": [[name, score], ...]}} for candidates with a match.
+    A name listed more than once is classified once, by its first occurrence; dropping the later
+    copies is up to the caller.
+    """
+    threshold = duplicate_settings()["similarity_threshold"] if threshold is None else threshold
+    matches = {}
+    earlier = []
+    for candidate in dict.fromkeys(candidates):
+        key = normalize_meal_name(candidate)
+        exact, similar = [], []
+        for other in list(catalog_hits.get(candidate, [])) + earlier:
+            other_key = normalize_meal_name(other)
+            score = name_similarity(key, other_key)
+            if other_key == key:
+                exact.append(other)
+            elif score >= threshold:
+                similar.append([other, round(score, 3)])
+        if exact or similar:
+            matches[candidate] = {"exact": list(dict.fromkeys(exact)), "similar": similar}
+        earlier.append(candidate)
+    return matches
@@ -0,0 +1,91 @@
+from ingredients import canonical_ingredient
+
+
+CATEGORIES = ["Fruits & Vegetables", "Dairy", "Plant Protein", "Meat & Seafood", "Pantry"]
+FALLBACK_CATEGORY = "Other"
+
+# Keyword -> category. Multi-word keys win over single words, so "almond milk" is Pantry
+# even though "milk" is Dairy, and "chili powder" is Pantry even though "chili" is a vegetable.
+TAXONOMY = {
+    # Fruits & Vegetables
+    "apple": "Fruits & Vegetables", "arugula": "Fruits & Vegetables", "asparagus": "Fruits & Vegetables",
+    "avocado": "Fruits & Vegetables", "banana": "Fruits & Vegetables", "basil": "Fruits & Vegetables",
+    "bean sprout": "Fruits & Vegetables", "bell pepper": "Fruits & Vegetables", "berry": "Fruits & Vegetables",
+    "bok choy": "Fruits & Vegetables", "broccoli": "Fruits & Vegetables", "cabbage": "Fruits & Vegetables",
+    "carrot": "Fruits & Vegetables", "cauliflower": "Fruits & Vegetables", "celery": "Fruits & Vegetables",
+    "chard": "Fruits & Vegetables", "chili": "Fruits & Vegetables", "cilantro": "Fruits & Vegetables",
+    "corn": "Fruits & Vegetables", "cucumber": "Fruits & Vegetables", "eggplant": "Fruits & Vegetables",
+    "garlic": "Fruits & Vegetables", "ginger": "Fruits & Vegetables", "green bean": "Fruits & Vegetables",
+    "kale": "Fruits & Vegetables", "leek": "Fruits & Vegetables", "lemon": "Fruits & Vegetables",
+    "lemongrass": "Fruits & Vegetables", "lettuce": "Fruits & Vegetables", "lime": "Fruits & Vegetables",
+    "mango": "Fruits & Vegetables", "mint": "Fruits & Vegetables", "mushroom": "Fruits & Vegetables",
+    "okra": "Fruits & Vegetables", "onion": "Fruits & Vegetables", "parsley": "Fruits & Vegetables",
+    "pea": "Fruits & Vegetables", "pepper": "Fruits & Vegetables", "potato": "Fruits & Vegetables",
+    "pumpkin": "Fruits & Vegetables", "scallion": "Fruits & Vegetables", "shallot": "Fruits & Vegetables",
+    "spinach": "Fruits & Vegetables", "squash": "Fruits & Vegetables", "sweet potato": "Fruits & Vegetables",
+    "thai basil": "Fruits & Vegetables", "tomato": "Fruits & Vegetables", "zucchini": "Fruits & Vegetables",
+    # Dairy
+    "butter": "Dairy", "cheese": "Dairy", "cream": "Dairy", "egg": "Dairy", "feta": "Dairy", "ghee": "Dairy",
+    "milk": "Dairy", "mozzarella": "Dairy", "paneer": "Dairy", "parmesan": "Dairy", "ricotta": "Dairy",
+    "yogurt": "Dairy",
+    # Plant Protein
+    "edamame": "Plant Protein", "seitan": "Plant Protein", "tempeh": "Plant Protein", "tofu": "Plant Protein",
+    # Meat & Seafood
+    "beef": "Meat & Seafood", "chicken": "Meat & Seafood", "fish": "Meat & Seafood", "pork": "Meat & Seafood",
+    "salmon": "Meat & Seafood", "shrimp": "Meat & Seafood", "turkey": "Meat & Seafood",
+    # Pantry
+    "bean": "Pantry", "black bean": "Pantry", "bread": "Pantry", "broth": "Pantry", "chickpea": "Pantry",
+    "coconut cream": "Pantry", "coconut milk": "Pantry", "couscous": "Pantry", "cumin": "Pantry",
+    "curry paste": "Pantry", "flour": "Pantry", "garam masala": "Pantry", "honey": "Pantry",
+    "lentil": "Pantry", "noodle": "Pantry", "nut": "Pantry", "oat": "Pantry", "oil": "Pantry",
+    "paprika": "Pantry", "pasta": "Pantry", "peanut": "Pantry", "quinoa": "Pantry", "rice": "Pantry",
+    "salt": "Pantry", "sauce": "Pantry", "seed": "Pantry", "soy sauce": "Pantry", "spice": "Pantry",
+    "stock": "Pantry", "sugar": "Pantry", "tahini": "Pantry", "tortilla": "Pantry", "turmeric": "Pantry",
+    "vinegar": "Pantry",
+    # Plant milks, creams and nut butters are not Dairy
+    "almond milk": "Pantry", "soy milk": "Pantry", "oat milk": "Pantry", "rice milk": "Pantry",
+    "cashew milk": "Pantry", "cashew cream": "Pantry", "vegan butter": "Pantry", "peanut butter": "Pantry",
+    "almond butter": "Pantry", "cashew butter": "Pantry", "nut butter": "Pantry", "seed butter": "Pantry",
+    "vegan cheese": "Pantry",
+    # Ground spices and dried seasonings are not produce
+    "black pepper": "Pantry", "white pepper": "Pantry", "cayenne pepper": "Pantry", "peppercorn": "Pantry",
+    "red pepper flake": "Pantry", "crushed red pepper": "Pantry", "chili flake": "Pantry", "chili powder": "Pantry", "chilli powder": "Pantry",
+    "garlic powder": "Pantry", "onion powder": "Pantry", "curry powder": "Pantry", "ginger powder": "Pantry",
+    "ground ginger": "Pantry", "powder": "Pantry", "cinnamon": "Pantry", "nutmeg": "Pantry",
+    "oregano": "Pantry", "thyme": "Pantry", "cayenne": "Pantry",
+}
+
+def categorize(name):
+    """Return the category of a normalized ingredient, preferring the longest matching phrase."""
+    words = name.split()
+    # Longest phrase anywhere in the name first, the later one on ties: "smooth peanut butter"
+    # matches "peanut butter" before "butter", "red bell pepper" matches "bell pepper" before "pepper"
+    for length in range(len(words), 0, -1):
+        for start in range(len(words) - length, -1, -1):
+            category = TAXONOMY.get(" ".join(words[start:start + length]))
+            if category:
+                return category
+    return FALLBACK_CATEGORY
+
+
+def build_grocery_list(ingredients):
+    """Normalize, dedupe and bucket raw ingredient strings into {category: [items]}."""
+    grouped = {}
+    for ingredient in ingredients:
+        name = canonical_ingredient(ingredient)
+        if name:
+            grouped.setdefault(categorize(name), set()).add(name)
+    return {
+        category: sorted(grouped[category])
+        for category in CATEGORIES + [FALLBACK_CATEGORY]
+        if category in grouped
+    }
+
+
+def grocery_list_from_plan(meal_plan):
+    """Build the categorized grocery list for a list of meals in the personal_chef shape."""
+    ingredients = []
+    for meal in meal_plan:
+        ingredients.extend(meal.get("main_ingredients", []))
+        ingredients.extend(meal.get("protein_source", []))
+    return build_grocery_list(ingredients)
@@ -0,0 +1,126 @@
+import functools
+import re
+from settings import load_config
+
+
+# Spelling variants and regional names -> the one name stored in the graph. Keys and values are
+# already normalized (lowercase, singular). Extend or override with "ingredient_aliases" in config.json.
+DEFAULT_ALIASES = {
+    "red bell pepper": "bell pepper", "green bell pepper": "bell pepper", "yellow bell pepper": "bell pepper",
+    "orange bell pepper": "bell pepper", "capsicum": "bell pepper", "sweet pepper": "bell pepper",
+    "garbanzo bean": "chickpea", "garbanzo": "chickpea", "chick pea": "chickpea",
+    "aubergine": "eggplant", "courgette": "zucchini", "coriander leaf": "cilantro",
+    "green onion": "scallion", "spring onion": "scallion",
+    "yellow onion": "onion", "white onion": "onion", "brown onion": "onion",
+    "extra virgin olive oil": "olive oil", "extra-virgin olive oil": "olive oil",
+    "vegetable stock": "vegetable broth", "beancurd": "tofu", "firm tofu": "tofu", "extra firm tofu": "tofu",
+    "extra-firm tofu": "tofu", "silken tofu": "tofu", "cherry tomato": "tomato", "roma tomato": "tomato",
+    "chilli": "chili", "basil leaf": "basil", "mint leaf": "mint", "cilantro leaf": "cilantro", "baby spinach": "spinach", "plain yogurt": "yogurt", "natural yogurt": "yogurt",
+}
+
+
+_QUANTITY = re.compile(
+    r"^\s*[\d/.\s½¼¾-]+\s*(cups?|tbsps?|tablespoons?|tsps?|teaspoons?|g|grams?|kg|ml|l|oz|ounces?|lbs?|pounds?|cans?|cloves?|bunch(es)?|pinch(es)?)?\b\.?\s*(of\s+)?",
+    re.IGNORECASE,
+)
+_TRAILING_UNITS = {"clove", "cloves", "sprig", "sprigs", "stalk", "stalks"}
+_DESCRIPTORS = {"fresh", "chopped", "diced", "minced", "sliced", "grated", "large", "small", "medium", "organic", "cooked", "dried", "frozen"}
+_IRREGULAR = {"leaves": "leaf", "loaves": "loaf", "halves": "half", "knives": "knife"}
+# Singular nouns that look plural; left as they are
+INVARIANT_WORDS = {
+    "molasses", "hummus", "couscous", "asparagus", "citrus", "swiss", "grits", "tapas", "pastis", "jus",
+    "brussels", "bitters",
+}
+# Nouns ending in -i, so "chilies" is "chili" rather than "chily"
+_I_NOUNS = {"chili", "chilli", "kiwi", "salami", "wasabi", "tahini", "broccoli", "pepperoni", "sushi", "biscotti"}
+# Nouns ending in -ie, so "cookies" is "cookie" rather than "cooky"
+_IE_NOUNS = {"cookie", "brownie", "smoothie", "veggie", "hoagie", "pastie", "calorie"}
+# Nouns recipes do not pluralize: "2 cups rice", never "rices"
+_MASS_NOUNS = {
+    "rice", "quinoa", "broccoli", "spinach", "kale", "chard", "arugula", "lettuce", "pasta", "couscous", "farro",
+    "tofu", "tempeh", "paneer", "seitan", "edamame", "yogurt", "milk", "cream", "cheese", "butter", "oil",
+    "flour", "sugar", "salt", "garlic", "ginger", "basil", "mint", "parsley", "cilantro", "squash", "pumpkin",
+}
+
+
+def singularize(word):
+    """Cheap English singularization for ingredient nouns."""
+    if word in INVARIANT_WORDS:
+        return word
+    if word in _IRREGULAR:
+        return _IRREGULAR[word]
+    if word.endswith("ies") and len(word) > 4:
+        stem = word[:-3]
+        if stem + "i" in _I_NOUNS:
+            return stem + "i"
+        return stem + "ie" if stem + "ie" in _IE_NOUNS else stem + "y"
+    if word.endswith("oes") and len(word) > 4:
+        return word[:-2]
+    if word.endswith(("ches", "shes", "sses", "xes")):
+        return word[:-2]
+    if word.endswith("s") and not word.endswith(("ss", "us")) and len(word) > 3:
+        return word[:-1]
+    return word
+
+
+def pluralize(name):
+    """Plural of a canonical ingredient name, for putting it back into recipe text."""
+    words = name.split()
+    if not words:
+        return name
+    word = words[-1]
+    plural_irregular = {singular: plural for plural, singular in _IRREGULAR.items()}
+    if word in INVARIANT_WORDS or word in _MASS_NOUNS:
+        plural = word
+    elif word in plural_irregular:
+        plural = plural_irregular[word]
+    elif word.endswith("y") and word[-2:-1] not in ("a", "e", "i", "o", "u"):
+        plural = word[:-1] + "ies"
+    elif word in ("chili", "chilli"):
+        plural = word + "es"
+    elif word.endswith(("s", "x", "ch", "sh")) or word in ("potato", "tomato", "mango"):
+        plural = word + "es"
+    else:
+        plural = word + "s"
+    return " ".join(words[:-1] + [plural])
+
+
+def normalize_ingredient(ingredient):
+    """Lowercase, strip quantities, notes and descriptors, and singularize the last word."""
+    name = _QUANTITY.sub("", ingredient.lower())
+    # Notes and sizes can sit anywhere, even between the quantity and its unit: "1 (14 oz) can tomatoes"
+    name = _QUANTITY.sub("", re.sub(r"\([^)]*\)?", " ", name))
+    name = name.split(",")[0]
+    words = [w for w in re.findall(r"[a-z][a-z'-]*", name) if w not in _DESCRIPTORS]
+    while len(words) > 1 and words[-1] in _TRAILING_UNITS:
+        words.pop()
+    if not words:
+        # Nothing but quantities and descriptors ("2 large"): keep the text rather than lose the ingredient
+        return " ".join(ingredient.lower().split())
+    words[-1] = singularize(words[-1])
+    return " ".join(words)
+
+
+@functools.lru_cache(maxsize=None)
+def load_aliases(path="config.json"):
+    """Return the default alias table merged with "ingredient_aliases" from config.json."""
+    aliases = dict(DEFAULT_ALIASES)
+    try:
+        overrides = load_config(path).get("ingredient_aliases", {})
+    except FileNotFoundError:
+        overrides = {}
+    for alias, canonical in overrides.items():
+        aliases[normalize_ingredient(alias)] = normalize_ingredient(canonical)
+    return aliases
+
+
+@functools.lru_cache(maxsize=65536)
+def canonical_ingredient(ingredient):
+    """The name an ingredient is stored and compared under: normalized, singular, aliases resolved."""
+    name = normalize_ingredient(ingredient)
+    return load_aliases().get(name, name)
+
+
+def canonical_ingredients(ingredients):
+    """Canonical names of a list of ingredients, in order, without duplicates or blanks."""
+    return [name for name in dict.fromkeys(canonical_ingredient(i) for i in ingredients) if name]
@@ -0,0 +1,32 @@
+from langchain_anthropic import ChatAnthropic
+from rate_limits import acall_with_retry, call_with_retry, get_limiter
+
+
+def estimate_tokens(messages):
+    """Rough input size (about four characters per token) reserved from the budget before a call."""
+    return max(1, sum(len(str(message.content)) for message in messages) // 4)
+
+
+def used_tokens(result):
+    """Total tokens Anthropic reported for a call, or None if the response has no usage."""
+    usage = getattr(result.generations[0].message, "usage_metadata", None) if result.generations else None
+    return usage["total_tokens"] if usage else None
+
+
+class RateLimitedChatAnthropic(ChatAnthropic):
+    """ChatAnthropic that shares the process-wide Anthropic concurrency and token-per-minute limits.
+
+    Limits apply below the LangChain cache, so cached responses never wait for quota.
+    """
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        return call_with_retry(
+            lambda: super(RateLimitedChatAnthropic, self)._generate(messages, stop, run_manager, **kwargs),
+            get_limiter("anthropic"), estimate_tokens(messages), used_tokens
+        )
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        return await acall_with_retry(
+            lambda: super(RateLimitedChatAnthropic, self)._agenerate(messages, stop, run_manager, **kwargs),
+            get_limiter("anthropic"), estimate_tokens(messages), used_tokens
+        )
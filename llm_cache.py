@@ -0,0 +1,102 @@
+import hashlib
+import json
+import threading
+import warnings
+from langchain_core._api import LangChainBetaWarning
+from langchain_core.caches import BaseCache
+from langchain_core.load import dumps, loads
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, Generation
+from settings import config_section
+from ttl_store import TTLStore
+
+
+# Fields that differ between otherwise identical conversations (message ids, per-call
+# response metadata) and must not be part of the cache key
+_VOLATILE_FIELDS = {"id", "response_metadata", "usage_metadata"}
+
+# Everything a chat model's cached generations deserialize to; nothing else is revived from the file
+_ALLOWED_OBJECTS = [Generation, ChatGeneration, ChatGenerationChunk, AIMessage, AIMessageChunk]
+
+DEFAULT_SETTINGS = {
+    "enabled": True,
+    "path": ".llm_cache.sqlite",
+    "ttl_seconds": 7 * 24 * 3600,
+    "max_entries": 5000,
+    "disabled_for": ["personal_chef"],
+}
+
+
+def _strip_volatile(value):
+    if isinstance(value, dict):
+        return {k: _strip_volatile(v) for k, v in value.items() if k not in _VOLATILE_FIELDS}
+    if isinstance(value, list):
+        return [_strip_volatile(v) for v in value]
+    return value
+
+
+def cache_key(prompt, llm_string):
+    """Hash the model configuration (model name, params, bound tools) and the normalized messages."""
+    try:
+        prompt = json.dumps(_strip_volatile(json.loads(prompt)), sort_keys=True)
+    except json.JSONDecodeError:
+        pass
+    return hashlib.sha256(f"{llm_string}\x00{prompt}".encode("utf-8")).hexdigest()
+
+
+class SQLiteLLMCache(BaseCache):
+    """On-disk chat model cache with TTL expiry and least-recently-used eviction."""
+
+    def __init__(self, path=DEFAULT_SETTINGS["path"], ttl_seconds=DEFAULT_SETTINGS["ttl_seconds"],
+                 max_entries=DEFAULT_SETTINGS["max_entries"]):
+        self.store = TTLStore(path, "llm_cache", ttl_seconds, max_entries)
+        # loads() announces its beta status on first use; only that notice is silenced
+        warnings.filterwarnings("ignore", message="The function `loads` is in beta", category=LangChainBetaWarning)
+
+    def lookup(self, prompt, llm_string):
+        value = self.store.get(cache_key(prompt, llm_string))
+        if value is None:
+            return None
+        generations = [loads(generation, allowed_objects=_ALLOWED_OBJECTS) for generation in json.loads(value)]
+        # Replayed usage_metadata is not a new API call; metrics counts these as cache hits
+        for generation in generations:
+            generation.generation_info = dict(generation.generation_info or {}, cached=True)
+        return generations
+
+    def update(self, prompt, llm_string, return_val):
+        value = json.dumps([dumps(generation) for generation in return_val])
+        self.store.set(cache_key(prompt, llm_string), value)
+
+    def clear(self, **kwargs):
+        self.store.clear()
+
+    def stats(self):
+        """Return hit/miss counters for this process and the number of stored entries."""
+        return self.store.stats()
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def load_cache_settings(path="config.json"):
+    return config_section("llm_cache", DEFAULT_SETTINGS, path)
+
+
+def get_llm_cache():
+    """Return the shared SQLite cache, creating it on first use."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                settings = load_cache_settings()
+                _cache = SQLiteLLMCache(settings["path"], settings["ttl_seconds"], settings["max_entries"])
+    return _cache
+
+
+def cache_for(agent_name):
+    """Return the cache to pass as `cache=` to an agent's chat model, or False to opt the agent out."""
+    settings = load_cache_settings()
+    if not settings["enabled"] or agent_name in settings["disabled_for"]:
+        return False
+    return get_llm_cache()
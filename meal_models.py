@@ -0,0 +1,88 @@
+from langchain_core.messages import HumanMessage, ToolMessage
+from pydantic import BaseModel, Field, RootModel, ValidationError
+from settings import config_section
+
+
+class Meal(BaseModel):
+    """One dinner, in the shape personal_chef produces and create_meal_graph stores."""
+    name: str = Field(min_length=1, description="Meal name")
+    main_ingredients: list[str] = Field(default_factory=list, description="Main ingredients, without quantities")
+    protein_source: list[str] = Field(default_factory=list, description="Protein source ingredients")
+    cooking_method: str = Field(default="", description="e.g. stir-fry, bake, simmer")
+    instructions: str = Field(description="Detailed step-by-step cooking instructions")
+
+
+class MealPlan(BaseModel):
+    """Meals for the plan, returned by calling this tool."""
+    meal_plan: list[Meal]
+
+
+class GroceryList(RootModel[dict[str, list[str]]]):
+    """Grocery items by category, e.g. {"Pantry": ["quinoa", "rice"]}."""
+
+
+class PushResult(BaseModel):
+    """Names of the meals meal_pusher wrote to the graph."""
+    pushed_meals: list[str]
+
+
+def structured_output_settings():
+    """How many times a model may correct an invalid structured reply ("max_repairs")."""
+    return config_section("structured_output", {"max_repairs": 1})
+
+
+def _repair_messages(raw, schema, error):
+    # Anthropic rejects a turn that leaves any tool_use block unanswered, so every call gets a reply
+    problem = f"Your {schema.__name__} call was invalid: {error}" if error else f"You did not call {schema.__name__}."
+    instruction = f"{problem}\nCall {schema.__name__} again with the corrected, complete data."
+    if raw.tool_calls:
+        return [
+            ToolMessage(content=instruction, tool_call_id=tool_call["id"], status="error")
+            for tool_call in raw.tool_calls
+        ]
+    return [HumanMessage(content=instruction)]
+
+
+def invoke_structured(model, schema, messages, max_repairs=None):
+    """Ask `model` for a `schema` object through tool calling and return it validated.
+
+    An invalid or missing tool call is shown back to the model with the validation errors,
+    at most `max_repairs` times, before ValueError is raised.
+    """
+    max_repairs = structured_output_settings()["max_repairs"] if max_repairs is None else max_repairs
+    structured = model.with_structured_output(schema, include_raw=True)
+    messages = list(messages)
+    for attempt in range(max_repairs + 1):
+        reply = structured.invoke(messages)
+        if reply["parsed"] is not None:
+            return reply["parsed"]
+        error = reply["parsing_error"]
+        if attempt < max_repairs:
+            messages += [reply["raw"], *_repair_messages(reply["raw"], schema, error)]
+    raise ValueError(f"No valid {schema.__name__} after {max_repairs} repair(s): {error}")
+
+
+async def ainvoke_structured(model, schema, messages, max_repairs=None):
+    """Async invoke_structured."""
+    max_repairs = structured_output_settings()["max_repairs"] if max_repairs is None else max_repairs
+    structured = model.with_structured_output(schema, include_raw=True)
+    messages = list(messages)
+    for attempt in range(max_repairs + 1):
+        reply = await structured.ainvoke(messages)
+        if reply["parsed"] is not None:
+            return reply["parsed"]
+        error = reply["parsing_error"]
+        if attempt < max_repairs:
+            messages += [reply["raw"], *_repair_messages(reply["raw"], schema, error)]
+    raise ValueError(f"No valid {schema.__name__} after {max_repairs} repair(s): {error}")
+
+
+def valid_meals(meals):
+    """Validate meal dicts, dropping (and reporting) any that do not fit the Meal schema."""
+    validated = []
+    for meal in meals:
+        try:
+            validated.append(Meal.model_validate(meal))
+        except ValidationError as e:
+            print(f"Skipping invalid meal {meal.get('name', '?') if isinstance(meal, dict) else meal!r}: {e}")
+    return validated
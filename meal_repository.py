@@ -0,0 +1,360 @@
+import atexit
+import threading
+from ingredients import canonical_ingredients
+from meal_selection import IngredientCatalog, select_meals, selection_settings
+from metrics import track_query
+from schema import ensure_schema
+from settings import config_section
+
+
+# Pool defaults, overridable from the "neo4j" section of config.json
+DEFAULT_POOL_SETTINGS = {
+    "max_connection_pool_size": 50,
+    "connection_acquisition_timeout": 30.0,
+    "liveness_check_timeout": 60.0,
+}
+
+_driver = None
+_driver_lock = threading.Lock()
+
+# Bumped by every write that can change what readers see; read caches key on it
+_graph_version = 0
+_graph_version_lock = threading.Lock()
+
+
+def load_neo4j_settings(path="config.json"):
+    """Read the Neo4j connection and pool settings from config.json."""
+    return config_section("neo4j", DEFAULT_POOL_SETTINGS, path)
+
+
+def get_driver():
+    """Return the process-wide Neo4j driver, creating it on first use."""
+    global _driver
+    if _driver is None:
+        with _driver_lock:
+            if _driver is None:
+                # The driver package pulls in pandas and pyarrow, so it is only imported when a connection is needed
+                from neo4j import GraphDatabase
+
+                settings = load_neo4j_settings()
+                _driver = GraphDatabase.driver(
+                    settings["uri"],
+                    auth=(settings["username"], settings["password"]),
+                    max_connection_pool_size=settings["max_connection_pool_size"],
+                    connection_acquisition_timeout=settings["connection_acquisition_timeout"],
+                    liveness_check_timeout=settings["liveness_check_timeout"],
+                )
+    return _driver
+
+
+def close_driver():
+    """Close the shared driver and its pooled connections."""
+    global _driver
+    with _driver_lock:
+        if _driver is not None:
+            _driver.close()
+            _driver = None
+
+
+atexit.register(close_driver)
+
+
+def graph_version():
+    """Return the number of meal writes made by this process so far."""
+    return _graph_version
+
+
+def bump_graph_version():
+    """Mark cached reads of the meal graph as stale."""
+    global _graph_version
+    with _graph_version_lock:
+        _graph_version += 1
+    return _graph_version
+
+
+def build_meal_rows(meal_plan):
+    """Convert meal dicts from the agents into UNWIND parameter rows, with canonical ingredient names."""
+    rows = []
+    for meal in meal_plan:
+        # "Bell Peppers" and "red bell pepper" both become the one (:Ingredient {name: "bell pepper"})
+        protein_sources = canonical_ingredients(meal.get("protein_source", []))
+        ingredients = canonical_ingredients(list(meal.get("main_ingredients", [])) + protein_sources)
+        rows.append({
+            "name": meal["name"],
+            "instructions": meal.get("instructions", ""),
+            "ingredients": ingredients,
+            "protein_sources": protein_sources,
+        })
+    return rows
+
+
+class MealRepository:
+    """Meal and ingredient queries on top of the shared, pooled driver."""
+
+    def __init__(self, driver=None):
+        self._driver = driver
+        # Rotation picks compare meals by their ingredient bitsets, kept in memory and updated on writes
+        self.catalog = IngredientCatalog(self.load_meal_ingredients)
+
+    @property
+    def driver(self):
+        return self._driver or get_driver()
+
+    def search_meal_names(self, queries, limit=5):
+        """Look up a batch of {"name", "query"} candidates in the meal name full-text index in one query.
+
+        Returns {candidate name: [catalog meal names]}, best match first, at most `limit` per candidate.
+        """
+        queries = [entry for entry in queries if entry["query"]]
+        if not queries:
+            return {}
+        with track_query("search_meal_names") as stats, self.driver.session() as session:
+            result = session.run(
+                """
+                UNWIND $candidates AS candidate
+                CALL db.index.fulltext.queryNodes('meal_name_fulltext', candidate.query, {limit: $limit})
+                YIELD node, score
+                RETURN candidate.name AS candidate, node.name AS meal_name
+                ORDER BY score DESC
+                """,
+                candidates=queries, limit=limit
+            )
+            hits = {}
+            for record in result:
+                hits.setdefault(record["candidate"], []).append(record["meal_name"])
+                stats.rows += 1
+            return hits
+
+    def load_meal_ingredients(self):
+        """Yield (meal name, ingredient names, protein names) for every meal in the catalog."""
+        with track_query("load_meal_ingredients") as stats, self.driver.session() as session:
+            result = session.run(
+                """
+                MATCH (m:Meal)
+                OPTIONAL MATCH (m)-[:CONTAINS]->(i:Ingredient)
+                RETURN m.name AS meal, collect(i.name) AS ingredients,
+                       collect(CASE WHEN i:Protein THEN i.name END) AS proteins
+                """
+            )
+            for record in result:
+                stats.rows += 1
+                yield record["meal"], record["ingredients"], record["proteins"]
+
+    def get_and_mark_old_meals(self, user_id, count=4, weeks=2, plan_id=None):
+        """Select up to `count` meals this user has not seen in the last `weeks` weeks, sharing as many
+        ingredients as possible, and record them as shown today.
+
+        The picks are recorded against `plan_id`, and a retry of the same plan gets the same meals back.
+        """
+        pool_size = max(selection_settings()["pool_size"], count)
+        # Load (or refresh) the bitsets before taking the household's lock
+        self.catalog.masks([])
+        with track_query("get_and_mark_old_meals") as query, self.driver.session() as session:
+            records = session.execute_write(self._rotate, user_id, count, weeks, pool_size, plan_id)
+            query.rows = len(records)
+        if records:
+            bump_graph_version()
+        return [{"name": record["meal_name"], "instructions": record["instructions"]} for record in records]
+
+    def _rotate(self, tx, user_id, count, weeks, pool_size, plan_id):
+        # Taking the write lock on the User node serializes concurrent rotations for the
+        # same household, so two runs cannot hand out the same meals.
+        tx.run(
+            "MERGE (u:User {id: $user_id}) SET u._rotation_lock = true REMOVE u._rotation_lock",
+            user_id=user_id
+        ).consume()
+        if plan_id is not None:
+            # A resumed plan whose rotation already went through keeps its meals
+            records = list(tx.run(
+                """
+                MATCH (u:User {id: $user_id})-[s:SHOWN {plan: $plan_id}]->(m:Meal)
+                RETURN m.name AS meal_name, m.description AS instructions
+                ORDER BY s.position
+                """,
+                user_id=user_id, plan_id=plan_id
+            ))
+            if records:
+                return records
+        # The pool holds meals the user has never been shown first. Skipping the user's history
+        # is bounded by its size, so LIMIT stops the catalog scan early.
+        records = list(tx.run(
+            """
+            MATCH (u:User {id: $user_id})
+            OPTIONAL MATCH (u)-[:SHOWN]->(seen:Meal)
+            WITH collect(seen) AS seen
+            MATCH (m:Meal)
+            WHERE NOT m IN seen
+            RETURN m.name AS meal_name, m.description AS instructions
+            LIMIT $count
+            """,
+            user_id=user_id, count=pool_size
+        ))
+        if len(records) < pool_size:
+            # Then the ones shown longest ago, read from the user's own history
+            records += list(tx.run(
+                """
+                MATCH (u:User {id: $user_id})-[s:SHOWN]->(m:Meal)
+                WHERE s.date < date() - duration({weeks: $weeks})
+                RETURN m.name AS meal_name, m.description AS instructions
+                ORDER BY s.date ASC
+                LIMIT $count
+                """,
+                user_id=user_id, weeks=weeks, count=pool_size - len(records)
+            ))
+        # Of the pool, keep the meals that make the smallest shopping list together
+        by_name = {record["meal_name"]: record for record in records}
+        records = [by_name[name] for name in select_meals(list(by_name), count, self.catalog)]
+        tx.run(
+            """
+            MATCH (u:User {id: $user_id})
+            UNWIND range(0, size($names) - 1) AS position
+            MATCH (m:Meal {name: $names[position]})
+            MERGE (u)-[s:SHOWN]->(m)
+            SET s.date = date(), s.plan = $plan_id, s.position = position
+            """,
+            user_id=user_id, plan_id=plan_id, names=[record["meal_name"] for record in records]
+        ).consume()
+        return records
+
+    def write_meal_plan(self, meal_rows):
+        """Merge a batch of meals, their ingredients and CONTAINS links in a single transaction."""
+        with track_query("write_meal_plan") as query, self.driver.session() as session:
+            query.rows = len(meal_rows)
+            session.execute_write(
+                lambda tx: tx.run(
+                    """
+                    UNWIND $meals AS meal
+                    MERGE (m:Meal {name: meal.name})
+                    SET m.description = meal.instructions
+                    WITH m, meal
+                    UNWIND meal.ingredients AS ingredient
+                    MERGE (i:Ingredient {name: ingredient})
+                    MERGE (m)-[:CONTAINS]->(i)
+                    FOREACH (_ IN CASE WHEN ingredient IN meal.protein_sources THEN [1] ELSE [] END |
+                        SET i:Protein)
+                    """,
+                    meals=meal_rows
+                ).consume()
+            )
+        self.catalog.add_meals(meal_rows)
+        bump_graph_version()
+
+    def get_ingredient_names(self):
+        """Return the names of all Ingredient nodes."""
+        with track_query("get_ingredient_names") as stats, self.driver.session() as session:
+            names = [record["name"] for record in session.run("MATCH (i:Ingredient) RETURN i.name AS name")]
+            stats.rows = len(names)
+            return names
+
+    def rewire_ingredients(self, merges, limit=1000):
+        """Move up to `limit` CONTAINS edges from alias ingredients to their canonical node in one transaction.
+
+        `merges` are {"alias", "canonical"} pairs. Returns the number of edges moved; call again until 0.
+        """
+        with track_query("rewire_ingredients") as stats, self.driver.session() as session:
+            moved = session.execute_write(
+                lambda tx: tx.run(
+                    """
+                    UNWIND $merges AS merge
+                    MATCH (m:Meal)-[r:CONTAINS]->(old:Ingredient {name: merge.alias})
+                    WITH m, r, old, merge
+                    LIMIT $limit
+                    MERGE (target:Ingredient {name: merge.canonical})
+                    MERGE (m)-[:CONTAINS]->(target)
+                    FOREACH (_ IN CASE WHEN old:Protein THEN [1] ELSE [] END | SET target:Protein)
+                    DELETE r
+                    RETURN count(*) AS moved
+                    """,
+                    merges=merges, limit=limit
+                ).single()["moved"]
+            )
+            stats.rows = moved
+        if moved:
+            bump_graph_version()
+        return moved
+
+    def delete_merged_ingredients(self, merges):
+        """Delete alias ingredients once their edges are moved, keeping the Protein label on the canonical node."""
+        with track_query("delete_merged_ingredients") as stats, self.driver.session() as session:
+            deleted = session.execute_write(
+                lambda tx: tx.run(
+                    """
+                    UNWIND $merges AS merge
+                    MATCH (old:Ingredient {name: merge.alias})
+                    MERGE (target:Ingredient {name: merge.canonical})
+                    FOREACH (_ IN CASE WHEN old:Protein THEN [1] ELSE [] END | SET target:Protein)
+                    DETACH DELETE old
+                    RETURN count(*) AS deleted
+                    """,
+                    merges=merges
+                ).single()["deleted"]
+            )
+            stats.rows = deleted
+        return deleted
+
+    def get_meal_ingredients(self, meal_names):
+        """Return {meal name: {"main_ingredients": [...], "protein_source": [...]}} for the given meals."""
+        query = """
+        MATCH (m:Meal)
+        WHERE m.name IN $meal_names
+        OPTIONAL MATCH (m)-[:CONTAINS]->(i:Ingredient)
+        RETURN m.name AS meal,
+               COLLECT(CASE WHEN i:Protein THEN null ELSE i.name END) AS main_ingredients,
+               COLLECT(CASE WHEN i:Protein THEN i.name END) AS protein_source
+        """
+        with track_query("get_meal_ingredients") as stats, self.driver.session() as session:
+            result = session.run(query, meal_names=list(meal_names))
+            ingredients = {
+                record["meal"]: {"main_ingredients": record["main_ingredients"], "protein_source": record["protein_source"]}
+                for record in result
+            }
+            stats.rows = len(ingredients)
+            return ingredients
+
+    def get_protein_names(self, ingredient_names):
+        """Return which of the given ingredient names are labelled :Protein in the graph."""
+        with track_query("get_protein_names") as stats, self.driver.session() as session:
+            result = session.run(
+                "UNWIND $names AS name MATCH (i:Ingredient:Protein {name: name}) RETURN i.name AS name",
+                names=list(ingredient_names),
+            )
+            names = [record["name"] for record in result]
+            stats.rows = len(names)
+            return names
+
+    def get_meals_with_ingredients_and_protein_tags(self, user_id):
+        """Fetch meals and their ingredients with protein tags, excluding those shown to the user in the last week."""
+        # Pick the meals before expanding ingredients so LIMIT cuts the scan short
+        query = """
+        OPTIONAL MATCH (:User {id: $user_id})-[s:SHOWN]->(recent:Meal)
+        WHERE s.date >= date() - duration({weeks: 1})
+        WITH collect(recent) AS recent
+        MATCH (m:Meal)
+        WHERE NOT m IN recent
+        WITH m
+        LIMIT 7
+        OPTIONAL MATCH (m)-[:CONTAINS]->(ing:Ingredient)
+        RETURN m.name AS meal,
+               m.description AS instructions,
+               COLLECT(ing.name + ' (' + CASE WHEN ing:Protein THEN 'Protein' ELSE 'Non-Protein' END + ')') AS ingredients
+        """
+        with track_query("get_meals_with_ingredients_and_protein_tags") as stats, self.driver.session() as session:
+            result = session.run(query, user_id=user_id)
+            meals = [record.data() for record in result]
+            stats.rows = len(meals)
+            return meals
+
+
+_repository = None
+_repository_lock = threading.Lock()
+
+
+def get_repository():
+    """Return the shared MealRepository instance, bootstrapping the graph schema on first use."""
+    global _repository
+    if _repository is None:
+        with _repository_lock:
+            if _repository is None:
+                ensure_schema(get_driver())
+                _repository = MealRepository()
+    return _repository
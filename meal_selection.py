@@ -0,0 +1,137 @@
+import threading
+import time
+from optimizer import IngredientIndex, normalize
+from settings import config_section
+
+
+DEFAULT_SETTINGS = {"pool_size": 200, "protein_weight": 2.0, "refresh_seconds": 600}
+
+
+def selection_settings(path="config.json"):
+    """Eligible meals considered per pick ("pool_size"), the bonus for a new protein ("protein_weight"),
+    and how often the in-memory catalog is reloaded to pick up other processes' writes ("refresh_seconds")."""
+    return config_section("selection", DEFAULT_SETTINGS, path)
+
+
+class IngredientCatalog:
+    """Ingredient and protein bitsets for every meal in the catalog, held in memory.
+
+    `load_meals` returns (name, ingredients, protein ingredients) for the whole catalog. It is
+    called on first use and again after `refresh_seconds`; writes made through this process are
+    applied straight away with add_meals.
+    """
+
+    def __init__(self, load_meals, refresh_seconds=None):
+        self._load_meals = load_meals
+        self._refresh_seconds = refresh_seconds
+        self._index = IngredientIndex()
+        self._masks = {}
+        self._loaded_at = None
+        self._lock = threading.Lock()
+
+    def _add(self, name, ingredients, proteins):
+        ingredients = [normalize(ingredient) for ingredient in ingredients]
+        proteins = [normalize(protein) for protein in proteins]
+        self._masks[name] = (self._index.bitset(ingredients + proteins), self._index.bitset(proteins))
+
+    def _ensure_loaded(self):
+        refresh_seconds = self._refresh_seconds
+        if refresh_seconds is None:
+            refresh_seconds = selection_settings()["refresh_seconds"]
+        if self._loaded_at is not None and time.monotonic() - self._loaded_at < refresh_seconds:
+            return
+        meals = list(self._load_meals())
+        self._index = IngredientIndex()
+        self._masks = {}
+        for name, ingredients, proteins in meals:
+            self._add(name, ingredients, proteins)
+        self._loaded_at = time.monotonic()
+
+    def add_meals(self, meal_rows):
+        """Apply a batch in the build_meal_rows shape, if the catalog has been loaded."""
+        with self._lock:
+            if self._loaded_at is None:
+                return
+            for row in meal_rows:
+                previous = self._masks.get(row["name"], (0, 0))
+                self._add(row["name"], row["ingredients"], row["protein_sources"])
+                # CONTAINS links are only ever merged, so a rewritten meal keeps its old ingredients
+                ingredients, proteins = self._masks[row["name"]]
+                self._masks[row["name"]] = (ingredients | previous[0], proteins | previous[1])
+
+    def masks(self, names):
+        """{name: (ingredient bitset, protein bitset)} for the given meals; unknown meals get empty sets."""
+        with self._lock:
+            self._ensure_loaded()
+            return {name: self._masks.get(name, (0, 0)) for name in names}
+
+    def __len__(self):
+        return len(self._masks)
+
+
+def select_meals(candidates, count, catalog, protein_weight=None):
+    """Pick `count` of `candidates` that share as many ingredients as possible and use different proteins.
+
+    Greedy: start from the meal whose ingredients are most common in the pool, then repeatedly add
+    the meal that reuses the most ingredients already picked, pays for the fewest new ones, and
+    brings a protein not yet in the plan. Candidates earlier in the list win ties, so callers put
+    the meals that are most due first.
+    """
+    if len(candidates) <= count:
+        return list(candidates)
+    protein_weight = selection_settings()["protein_weight"] if protein_weight is None else protein_weight
+
+    # Meals with the same bitsets are interchangeable, so each distinct pair is scored once
+    groups = {}
+    for name, masks in catalog.masks(candidates).items():
+        groups.setdefault(masks, []).append(name)
+    order = {name: position for position, name in enumerate(candidates)}
+    for names in groups.values():
+        names.sort(key=order.__getitem__)
+
+    # How many pool meals use each ingredient bit
+    frequency = {}
+    for (ingredients, _), names in groups.items():
+        while ingredients:
+            bit = ingredients & -ingredients
+            frequency[bit] = frequency.get(bit, 0) + len(names)
+            ingredients ^= bit
+
+    def popularity(masks):
+        ingredients = masks[0]
+        total = bits = 0
+        while ingredients:
+            bit = ingredients & -ingredients
+            total += frequency[bit] - 1
+            bits += 1
+            ingredients ^= bit
+        return total / bits if bits else 0.0
+
+    def take(masks):
+        name = groups[masks].pop(0)
+        if not groups[masks]:
+            del groups[masks]
+        return name
+
+    def rank(masks):
+        # Higher is better; the earliest candidate breaks ties
+        return order[groups[masks][0]]
+
+    first = max(groups, key=lambda masks: (popularity(masks), -rank(masks)))
+    picked = [take(first)]
+    union, proteins = first
+    while len(picked) < count:
+        best, best_score = None, None
+        for masks in groups:
+            ingredients, protein = masks
+            score = (ingredients & union).bit_count() - (ingredients & ~union).bit_count()
+            if protein & ~proteins:
+                score += protein_weight
+            elif protein:
+                score -= protein_weight
+            if best is None or score > best_score or (score == best_score and rank(masks) < rank(best)):
+                best, best_score = masks, score
+        picked.append(take(best))
+        union |= best[0]
+        proteins |= best[1]
+    return picked
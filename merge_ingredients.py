@@ -0,0 +1,75 @@
+import argparse
+import time
+from bulk_import import batched
+from grocery import TAXONOMY
+from ingredients import INVARIANT_WORDS, canonical_ingredient, load_aliases
+from meal_repository import get_repository
+
+
+def _dictionary_words():
+    """Words known to be correct ingredient names as they are."""
+    words = set(INVARIANT_WORDS)
+    for name in list(TAXONOMY) + list(load_aliases().values()):
+        words.update(name.split())
+    return words
+
+
+def plan_merges(names):
+    """Pair every ingredient name that is not in canonical form with the name it should merge into.
+
+    A rename that would only change a last word that is already a dictionary word is skipped, so a
+    gap in the singularization rules cannot rename nodes that are correct ("molasses" -> "molass").
+    Names in the alias table always merge.
+    """
+    dictionary = _dictionary_words()
+    aliases = load_aliases()
+    merges = []
+    for name in names:
+        canonical = canonical_ingredient(name)
+        if not canonical or canonical == name:
+            continue
+        last_word = name.split()[-1] if name.split() else ""
+        if name not in aliases and last_word in dictionary and not canonical.endswith(last_word):
+            print(f"Skipping {name!r} -> {canonical!r}: {last_word!r} is already a dictionary word")
+            continue
+        merges.append({"alias": name, "canonical": canonical})
+    return merges
+
+
+def merge_ingredients(batch_size=1000, repository=None, dry_run=False):
+    """Merge duplicate Ingredient nodes into their canonical node, moving CONTAINS edges `batch_size`
+    at a time so no transaction grows with the size of the graph. Returns the number of aliases merged."""
+    repository = repository or get_repository()
+    merges = plan_merges(repository.get_ingredient_names())
+    print(f"{len(merges)} ingredient names to merge into {len({m['canonical'] for m in merges})} canonical names")
+    if dry_run:
+        for merge in merges:
+            print(f"  {merge['alias']!r} -> {merge['canonical']!r}")
+        return 0
+
+    started = time.perf_counter()
+    moved = 0
+    for batch in batched(merges, batch_size):
+        # Edges first, in bounded transactions, so the alias nodes are empty when they are deleted
+        while True:
+            count = repository.rewire_ingredients(batch, limit=batch_size)
+            if not count:
+                break
+            moved += count
+            print(f"Moved {moved} CONTAINS edges ({moved / max(time.perf_counter() - started, 1e-9):.0f}/s)")
+        repository.delete_merged_ingredients(batch)
+
+    print(f"Done: merged {len(merges)} ingredient names, moved {moved} edges in {time.perf_counter() - started:.2f}s")
+    return len(merges)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Merge duplicate ingredient nodes into their canonical names.")
+    parser.add_argument("--batch-size", type=int, default=1000, help="Aliases per batch and edges moved per transaction")
+    parser.add_argument("--dry-run", action="store_true", help="Only print the planned merges")
+    args = parser.parse_args()
+    merge_ingredients(batch_size=args.batch_size, dry_run=args.dry_run)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,340 @@
+import contextlib
+import contextvars
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from langchain_core.callbacks import BaseCallbackHandler
+from settings import config_section
+
+
+# USD per million input/output tokens, overridable from "metrics.pricing" in config.json
+DEFAULT_PRICING = {
+    "claude-3-7-sonnet-20250219": {"input": 3.00, "output": 15.00},
+    "claude-3-5-haiku-20241022": {"input": 0.80, "output": 4.00},
+}
+
+DEFAULT_SETTINGS = {"host": "127.0.0.1", "port": 9464, "pricing": {}}
+
+
+def metrics_settings(path="config.json"):
+    return config_section("metrics", DEFAULT_SETTINGS, path)
+
+
+def token_cost(model, input_tokens, output_tokens):
+    """Dollar cost of a call, or 0.0 for models without a price."""
+    price = dict(DEFAULT_PRICING, **metrics_settings()["pricing"]).get(model)
+    if not price:
+        return 0.0
+    return (input_tokens * price["input"] + output_tokens * price["output"]) / 1_000_000
+
+
+class Aggregate:
+    """Running totals for one label set: calls, seconds and any extra counters."""
+
+    def __init__(self):
+        self.calls = 0
+        self.seconds = 0.0
+        self.counters = {}
+
+    def add(self, seconds, **counters):
+        self.calls += 1
+        self.seconds += seconds
+        for name, value in counters.items():
+            self.counters[name] = self.counters.get(name, 0) + value
+
+
+class MetricSet:
+    """Thread-safe aggregates keyed by (family, labels)."""
+
+    def __init__(self):
+        self._aggregates = {}
+        self._lock = threading.Lock()
+
+    def observe(self, family, labels, seconds, **counters):
+        key = (family, tuple(sorted(labels.items())))
+        with self._lock:
+            self._aggregates.setdefault(key, Aggregate()).add(seconds, **counters)
+
+    def rows(self, family):
+        """Return one dict per label set of a family, slowest first."""
+        with self._lock:
+            rows = [
+                dict(dict(labels), calls=aggregate.calls, seconds=round(aggregate.seconds, 4), **aggregate.counters)
+                for (name, labels), aggregate in self._aggregates.items()
+                if name == family
+            ]
+        return sorted(rows, key=lambda row: -row["seconds"])
+
+    def items(self):
+        with self._lock:
+            return [(name, dict(labels), aggregate) for (name, labels), aggregate in self._aggregates.items()]
+
+
+# Process-wide totals behind the Prometheus endpoint
+REGISTRY = MetricSet()
+
+_current_run = contextvars.ContextVar("current_run", default=None)
+
+
+def observe(family, labels, seconds, run=None, **counters):
+    """Record one measurement in the process totals and in the given run, or the run tracked in this context."""
+    REGISTRY.observe(family, labels, seconds, **counters)
+    run = run or _current_run.get()
+    if run is not None:
+        run.metrics.observe(family, labels, seconds, **counters)
+
+
+@contextlib.contextmanager
+def track_query(name):
+    """Time a Cypher query; set `.rows` on the yielded object to record how many rows it returned."""
+    query = type("QueryStats", (), {"rows": 0})()
+    started = time.perf_counter()
+    try:
+        yield query
+    finally:
+        observe("cypher", {"query": name}, time.perf_counter() - started, rows=query.rows)
+
+
+@contextlib.contextmanager
+def track_call(provider, operation):
+    """Time a call to an external service that is not a LangChain model, e.g. a Tavily search."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe("external", {"provider": provider, "operation": operation}, time.perf_counter() - started)
+
+
+def _stage_name(metadata, fallback):
+    """Path of the node that is running, e.g. "generation_supervisor/personal_chef/agent"."""
+    metadata = metadata or {}
+    # checkpoint_ns looks like "generation_supervisor:<task id>|personal_chef:<task id>"
+    parts = [part.split(":")[0] for part in metadata.get("checkpoint_ns", "").split("|") if part]
+    node = metadata.get("langgraph_node")
+    if node and (not parts or parts[-1] != node):
+        parts.append(node)
+    return "/".join(parts) or fallback
+
+
+class MetricsCallbackHandler(BaseCallbackHandler):
+    """Times graph nodes, model calls and tools, and records model token usage and cost."""
+
+    def __init__(self, run=None):
+        self.run = run
+        self._started = {}
+        self._lock = threading.Lock()
+
+    def _start(self, run_id, family, labels):
+        with self._lock:
+            self._started[run_id] = (time.perf_counter(), family, labels)
+
+    def _finish(self, run_id, extra_labels=None, **counters):
+        with self._lock:
+            started = self._started.pop(run_id, None)
+        if started is not None:
+            begin, family, labels = started
+            labels = dict(labels, **extra_labels) if extra_labels else labels
+            observe(family, labels, time.perf_counter() - begin, run=self.run, **counters)
+        return started
+
+    def on_chain_start(self, serialized, inputs, *, run_id, parent_run_id=None, metadata=None, **kwargs):
+        # Only graph nodes themselves, not the runnables they are built from
+        node = (metadata or {}).get("langgraph_node")
+        if not node or kwargs.get("name") != node:
+            return
+        labels = {"stage": _stage_name(metadata, node)}
+        with self._lock:
+            parent = self._started.get(parent_run_id)
+        # A node wrapping a runnable of the same name (e.g. a RunnableLambda) is one stage
+        if parent is None or parent[2] != labels:
+            self._start(run_id, "stage", labels)
+
+    def on_chain_end(self, outputs, *, run_id, **kwargs):
+        self._finish(run_id)
+
+    def on_chain_error(self, error, *, run_id, **kwargs):
+        self._finish(run_id)
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, metadata=None, **kwargs):
+        metadata = metadata or {}
+        self._start(run_id, "llm", {
+            "agent": _stage_name(metadata, kwargs.get("name") or "model"),
+            "model": metadata.get("ls_model_name", "unknown"),
+        })
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        usage = {}
+        cached = False
+        for generations in response.generations:
+            for generation in generations:
+                usage = getattr(getattr(generation, "message", None), "usage_metadata", None) or usage
+                cached = cached or bool((generation.generation_info or {}).get("cached"))
+        with self._lock:
+            started = self._started.get(run_id)
+        if started is None:
+            return
+        if cached:
+            # Served by llm_cache: the replayed usage was paid for by the original call
+            self._finish(run_id, {"cached": "true"}, input_tokens=0, output_tokens=0, cost=0.0)
+            return
+        input_tokens = usage.get("input_tokens", 0)
+        output_tokens = usage.get("output_tokens", 0)
+        self._finish(
+            run_id,
+            {"cached": "false"},
+            input_tokens=input_tokens,
+            output_tokens=output_tokens,
+            cost=token_cost(started[2]["model"], input_tokens, output_tokens),
+        )
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._finish(run_id, {"cached": "false"})
+
+    def on_tool_start(self, serialized, input_str, *, run_id, metadata=None, **kwargs):
+        self._start(run_id, "tool", {"tool": kwargs.get("name") or (serialized or {}).get("name", "tool")})
+
+    def on_tool_end(self, output, *, run_id, **kwargs):
+        self._finish(run_id)
+
+    def on_tool_error(self, error, *, run_id, **kwargs):
+        self._finish(run_id)
+
+
+class RunMetrics:
+    """Measurements for a single plan, with the callback handler to pass in the graph's config."""
+
+    def __init__(self, run_id=None):
+        self.run_id = run_id or uuid.uuid4().hex
+        self.metrics = MetricSet()
+        # Callbacks can fire on LangChain's worker threads, so the handler reports to the run directly
+        self.handler = MetricsCallbackHandler(self)
+        self.started = time.perf_counter()
+        self.seconds = None
+
+    def config(self):
+        """Config for graph.invoke/stream that reports to this run."""
+        return {"callbacks": [self.handler], "metadata": {"plan_run_id": self.run_id}}
+
+    def report(self):
+        """Structured per-run breakdown: stages, model calls, tools, external calls and Cypher queries, slowest first."""
+        llm = self.metrics.rows("llm")
+        for row in llm:
+            row["cost"] = round(row.get("cost", 0.0), 6)
+        return {
+            "run_id": self.run_id,
+            "seconds": round(self.seconds if self.seconds is not None else time.perf_counter() - self.started, 3),
+            "totals": {
+                "input_tokens": sum(row.get("input_tokens", 0) for row in llm),
+                "output_tokens": sum(row.get("output_tokens", 0) for row in llm),
+                "cost": round(sum(row["cost"] for row in llm), 6),
+                "model_calls": sum(row["calls"] for row in llm if row.get("cached") != "true"),
+                "cache_hits": sum(row["calls"] for row in llm if row.get("cached") == "true"),
+                "queries": sum(row["calls"] for row in self.metrics.rows("cypher")),
+            },
+            "stages": self.metrics.rows("stage"),
+            "llm": llm,
+            "tools": self.metrics.rows("tool"),
+            "external": self.metrics.rows("external"),
+            "cypher": self.metrics.rows("cypher"),
+        }
+
+
+@contextlib.contextmanager
+def track_run(run_id=None):
+    """Collect everything measured inside the block (and in the graph given `run.config()`) into one RunMetrics."""
+    run = RunMetrics(run_id)
+    token = _current_run.set(run)
+    try:
+        yield run
+    finally:
+        run.seconds = time.perf_counter() - run.started
+        _current_run.reset(token)
+        observe("run", {}, run.seconds)
+
+
+# Prometheus names for each family: (metric prefix, help text)
+_FAMILIES = {
+    "run": ("meal_planner_run", "Whole plan runs"),
+    "stage": ("meal_planner_stage", "Graph nodes (supervisors, agents, pipeline steps)"),
+    "llm": ("meal_planner_llm", "Chat model calls"),
+    "tool": ("meal_planner_tool", "Agent tool calls"),
+    "external": ("meal_planner_external", "Calls to external services"),
+    "cypher": ("meal_planner_cypher", "Neo4j queries"),
+}
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in sorted(labels.items())) + "}"
+
+
+def render_prometheus(registry=REGISTRY):
+    """Render the process totals in the Prometheus text exposition format."""
+    items = registry.items()
+    lines = []
+    for family, (prefix, help_text) in _FAMILIES.items():
+        rows = [(labels, aggregate) for name, labels, aggregate in items if name == family]
+        if not rows:
+            continue
+        lines.append(f"# HELP {prefix}_seconds {help_text}: wall time")
+        lines.append(f"# TYPE {prefix}_seconds summary")
+        for labels, aggregate in rows:
+            lines.append(f"{prefix}_seconds_sum{_labels(labels)} {aggregate.seconds}")
+            lines.append(f"{prefix}_seconds_count{_labels(labels)} {aggregate.calls}")
+        counters = sorted({name for _, aggregate in rows for name in aggregate.counters})
+        for counter in counters:
+            metric = f"{prefix}_{counter}_{'dollars_total' if counter == 'cost' else 'total'}"
+            lines.append(f"# HELP {metric} {help_text}: {counter.replace('_', ' ')}")
+            lines.append(f"# TYPE {metric} counter")
+            for labels, aggregate in rows:
+                if counter in aggregate.counters:
+                    lines.append(f"{metric}{_labels(labels)} {aggregate.counters[counter]}")
+    return "\n".join(lines) + "\n"
+
+
+class _MetricsRequestHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = render_prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+_server = None
+_server_lock = threading.Lock()
+
+
+def start_metrics_server(port=None, host=None):
+    """Serve /metrics on a daemon thread, once per process. Returns the port, or None when disabled.
+
+    Binds to `metrics.host`, loopback by default; set it to "0.0.0.0" for a scraper on another machine.
+    """
+    global _server
+    settings = metrics_settings()
+    port = settings["port"] if port is None else port
+    host = settings["host"] if host is None else host
+    if not port and port != 0:
+        return None
+    with _server_lock:
+        if _server is None:
+            try:
+                _server = ThreadingHTTPServer((host, port), _MetricsRequestHandler)
+            except OSError as e:
+                print(f"Metrics endpoint not started on {host}:{port}: {e}")
+                return None
+            threading.Thread(target=_server.serve_forever, name="metrics-server", daemon=True).start()
+        return _server.server_address[1]
@@ -0,0 +1,165 @@
+import re
+from ingredients import canonical_ingredient, canonical_ingredients, pluralize
+from settings import load_config
+
+
+# Default substitutions: ingredient -> acceptable replacements, tried in order.
+# Override or extend with "ingredient_swaps" in config.json.
+DEFAULT_SWAPS = {
+    "zucchini": ["bell pepper", "eggplant", "carrot"],
+    "eggplant": ["zucchini", "bell pepper"],
+    "kale": ["spinach", "swiss chard"],
+    "swiss chard": ["spinach", "kale"],
+    "arugula": ["spinach"],
+    "leek": ["onion"],
+    "shallot": ["onion"],
+    "red onion": ["onion"],
+    "scallion": ["onion"],
+    "sweet potato": ["potato", "butternut squash"],
+    "butternut squash": ["sweet potato", "pumpkin"],
+    "cauliflower": ["broccoli"],
+    "green beans": ["broccoli", "peas"],
+    "brown rice": ["rice", "quinoa"],
+    "basmati rice": ["rice"],
+    "jasmine rice": ["rice"],
+    "couscous": ["quinoa", "rice"],
+    "farro": ["quinoa", "brown rice"],
+    "penne": ["pasta"],
+    "spaghetti": ["pasta"],
+    "coconut cream": ["coconut milk"],
+    "greek yogurt": ["yogurt"],
+    "cilantro": ["parsley"],
+    "lime": ["lemon"],
+    # Proteins only ever swap for proteins
+    "black beans": ["kidney beans", "chickpeas"],
+    "kidney beans": ["black beans", "chickpeas"],
+    "cannellini beans": ["chickpeas", "kidney beans"],
+    "chickpeas": ["kidney beans", "black beans"],
+    "red lentils": ["lentils"],
+    "green lentils": ["lentils"],
+    "tempeh": ["tofu"],
+    "paneer": ["tofu"],
+    "edamame": ["peas"],
+}
+
+
+def load_swap_table(path="config.json"):
+    """Return the default swap table merged with any overrides from config.json."""
+    swaps = {normalize(key): [normalize(r) for r in values] for key, values in DEFAULT_SWAPS.items()}
+    try:
+        config = load_config(path)
+    except FileNotFoundError:
+        return swaps
+    for ingredient, replacements in config.get("ingredient_swaps", {}).items():
+        swaps[normalize(ingredient)] = [normalize(r) for r in replacements]
+    return swaps
+
+
+def normalize(ingredient):
+    # The same names the graph stores, so recycled and new meals compare like for like
+    return canonical_ingredient(ingredient)
+
+
+class IngredientIndex:
+    """Assigns each ingredient a bit so meals can be compared as integer bitsets."""
+
+    def __init__(self):
+        self.bits = {}
+        self.names = []
+
+    def bit(self, ingredient):
+        if ingredient not in self.bits:
+            self.bits[ingredient] = 1 << len(self.names)
+            self.names.append(ingredient)
+        return self.bits[ingredient]
+
+    def bitset(self, ingredients):
+        mask = 0
+        for ingredient in ingredients:
+            mask |= self.bit(ingredient)
+        return mask
+
+
+def _replace_in_text(text, old, new):
+    if not text:
+        return text
+    # Names are singular, the instructions may use the plural: "black beans" becomes "kidney beans"
+    plural_old, plural_new = pluralize(old), pluralize(new)
+
+    def replacement(match):
+        found = match.group(0)
+        word = plural_new if found.lower() == plural_old and plural_old != old else new
+        return word[:1].upper() + word[1:] if found[:1].isupper() else word
+
+    pattern = "|".join(re.escape(form) for form in sorted({old, plural_old}, key=len, reverse=True))
+    return re.sub(rf"\b(?:{pattern})\b", replacement, text, flags=re.IGNORECASE)
+
+
+def optimize_meal_plan(meals, protein_ingredients=(), swaps=None):
+    """Greedily swap ingredients into ones already on the list to minimize unique ingredients.
+
+    `meals` use the personal_chef shape (name, main_ingredients, protein_source, cooking_method,
+    instructions). `protein_ingredients` are names labelled :Protein in the graph; an ingredient is
+    only ever replaced by one of the same kind. Returns the optimized_meal_plan payload.
+    """
+    swaps = load_swap_table() if swaps is None else swaps
+    index = IngredientIndex()
+
+    proteins = {normalize(p) for p in protein_ingredients}
+    plan = []
+    for meal in meals:
+        main = canonical_ingredients(meal.get("main_ingredients", []))
+        protein = canonical_ingredients(meal.get("protein_source", []))
+        proteins.update(protein)
+        plan.append({
+            "name": meal["name"],
+            "main_ingredients": main,
+            "protein_source": protein,
+            "cooking_method": meal.get("cooking_method", ""),
+            "instructions": meal.get("instructions", ""),
+        })
+    masks = [index.bitset(m["main_ingredients"] + m["protein_source"]) for m in plan]
+    unique_before = _union(masks).bit_count()
+
+    substitutions = []
+    while True:
+        union = _union(masks)
+        usage = {name: sum(1 for mask in masks if mask & bit) for name, bit in index.bits.items() if union & bit}
+
+        best = None
+        # Rarely used ingredients are the cheapest to eliminate
+        for ingredient in sorted(usage, key=lambda name: (usage[name], name)):
+            candidates = [
+                r for r in swaps.get(ingredient, [])
+                if r != ingredient and r in usage and (r in proteins) == (ingredient in proteins)
+            ]
+            if candidates:
+                best = (ingredient, max(candidates, key=lambda r: usage[r]))
+                break
+        if best is None:
+            break
+
+        old, new = best
+        old_bit, new_bit = index.bits[old], index.bits[new]
+        for i, meal in enumerate(plan):
+            if not masks[i] & old_bit:
+                continue
+            for key in ("main_ingredients", "protein_source"):
+                meal[key] = list(dict.fromkeys(new if name == old else name for name in meal[key]))
+            meal["instructions"] = _replace_in_text(meal["instructions"], old, new)
+            masks[i] = (masks[i] & ~old_bit) | new_bit
+            substitutions.append({"meal": meal["name"], "replaced": old, "with": new})
+
+    return {
+        "optimized_meal_plan": plan,
+        "substitutions": substitutions,
+        "unique_ingredients_before": unique_before,
+        "unique_ingredients": _union(masks).bit_count(),
+    }
+
+
+def _union(masks):
+    union = 0
+    for mask in masks:
+        union |= mask
+    return union
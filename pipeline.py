@@ -0,0 +1,230 @@
+import argparse
+import asyncio
+import functools
+import json
+from langgraph.graph import END, START, StateGraph
+from langchain_core.runnables import RunnableLambda
+from agents import (
+    get_personal_chef, grocery_shopper_node, meal_checker_node, meal_pusher_node, menu_optimizer_node,
+)
+from checkpoints import get_checkpointer, new_thread_id, run_plan
+from duplicates import normalize_meal_name
+from metrics import track_run
+from plan_state import PlanState, generated_summary
+from settings import config_section, load_config
+from tools import find_duplicate_meals, rotation_settings
+
+
+CUISINES = ["Indian", "Thai", "Italian"]
+
+
+def plan_size():
+    return load_config().get("plan_size", 6)
+
+
+def generation_settings():
+    """Fan-out options for personal_chef: meals per call, parallel calls, and top-up rounds."""
+    return config_section("generation", {"batch_size": 1, "max_concurrency": 3, "max_rounds": 2})
+
+
+class PipelineState(PlanState):
+    meals_needed: int
+    generation_rounds: int
+
+
+def _meal_key(meal):
+    # Word order, case, plurals and filler words do not make a different meal
+    return normalize_meal_name(meal.get("name", ""))
+
+
+def generation_requests(count, avoid_names):
+    """Split `count` meals into personal_chef inputs of at most `generation.batch_size` meals each."""
+    batch_size = generation_settings()["batch_size"]
+    avoid = f" Do not reuse any of these meal names: {', '.join(sorted(avoid_names))}." if avoid_names else ""
+    inputs = []
+    for i, start in enumerate(range(0, count, batch_size)):
+        size = min(batch_size, count - start)
+        # Spread parallel calls across cuisines so they don't converge on the same dish
+        cuisine = CUISINES[i % len(CUISINES)]
+        inputs.append({
+            "messages": [{
+                "role": "user",
+                "content": f"Generate {size} new {cuisine} vegetarian meal(s) that are not already in the database.{avoid}"
+            }],
+            "recipe_query": f"healthy {cuisine} vegetarian dinner",
+        })
+    return inputs
+
+
+def merge_generated(results, existing_meals):
+    """Collect the meals from each personal_chef result, rejecting ones that repeat a meal in the plan,
+    in the catalog or in the same batch. The catalog is checked with one indexed query per batch."""
+    seen = {_meal_key(meal) for meal in existing_meals}
+    candidates = []
+    for result in results:
+        # A batch whose MealPlan stayed invalid after repair is left to the top-up round
+        if isinstance(result, Exception):
+            print(f"personal_chef batch failed: {result}")
+            continue
+        # personal_chef hands back validated meals, so nothing is re-parsed from text
+        candidates.extend(result.get("generated_meals", []))
+    duplicates = find_duplicate_meals([meal["name"] for meal in candidates]) if candidates else {}
+    meals = []
+    for meal in candidates:
+        # Later copies of a name are caught by `seen`; the first copy is only dropped for a real match
+        key = _meal_key(meal)
+        if key and key not in seen and meal["name"] not in duplicates:
+            seen.add(key)
+            meals.append(meal)
+    return meals
+
+
+def fan_out_generation(count, existing_meals):
+    """Generate `count` meals with parallel personal_chef calls, capped at `generation.max_concurrency`."""
+    if count <= 0:
+        return []
+    inputs = generation_requests(count, [meal["name"] for meal in existing_meals])
+    results = get_personal_chef().batch(
+        inputs, config={"max_concurrency": generation_settings()["max_concurrency"]}, return_exceptions=True
+    )
+    return merge_generated(results, existing_meals)
+
+
+async def afan_out_generation(count, existing_meals):
+    if count <= 0:
+        return []
+    inputs = generation_requests(count, [meal["name"] for meal in existing_meals])
+    results = await get_personal_chef().abatch(
+        inputs, config={"max_concurrency": generation_settings()["max_concurrency"]}, return_exceptions=True
+    )
+    # The duplicate check queries Neo4j with the sync driver
+    return await asyncio.to_thread(merge_generated, results, existing_meals)
+
+
+def speculative_meal_count():
+    """Runs alongside check_meals, so only generate the meals needed even when the rotation lookup returns a full set."""
+    return max(plan_size() - rotation_settings()["count"], 0)
+
+
+def generate_meals(state: PipelineState):
+    meals = fan_out_generation(speculative_meal_count(), [])
+    return {"messages": [generated_summary("personal_chef", meals)], "generated_meals": meals}
+
+
+async def agenerate_meals(state: PipelineState):
+    meals = await afan_out_generation(speculative_meal_count(), [])
+    return {"messages": [generated_summary("personal_chef", meals)], "generated_meals": meals}
+
+
+def count_meals(state: PipelineState):
+    """Join point: drop generated meals that clash with recycled ones and work out the shortfall."""
+    selected_keys = {_meal_key(meal) for meal in state["selected_meals"]}
+    generated_meals = [meal for meal in state.get("generated_meals", []) if _meal_key(meal) not in selected_keys]
+    return {
+        "generated_meals": generated_meals,
+        "meals_needed": max(plan_size() - len(state["selected_meals"]) - len(generated_meals), 0),
+    }
+
+
+def route_after_check(state: PipelineState):
+    """Top up until the week is full, giving up after `generation.max_rounds` rounds of duplicates."""
+    max_rounds = generation_settings()["max_rounds"]
+    if state["meals_needed"] > 0 and state.get("generation_rounds", 0) < max_rounds:
+        return "top_up_meals"
+    return "optimize_meals"
+
+
+def top_up_meals(state: PipelineState):
+    existing_meals = state["selected_meals"] + state["generated_meals"]
+    meals = fan_out_generation(state["meals_needed"], existing_meals)
+    return {
+        "messages": [generated_summary("personal_chef", meals)],
+        "generated_meals": state["generated_meals"] + meals,
+        "generation_rounds": state.get("generation_rounds", 0) + 1,
+    }
+
+
+async def atop_up_meals(state: PipelineState):
+    existing_meals = state["selected_meals"] + state["generated_meals"]
+    meals = await afan_out_generation(state["meals_needed"], existing_meals)
+    return {
+        "messages": [generated_summary("personal_chef", meals)],
+        "generated_meals": state["generated_meals"] + meals,
+        "generation_rounds": state.get("generation_rounds", 0) + 1,
+    }
+
+
+def optimize_meals(state: PipelineState):
+    # The same validated steps the supervisor mode's menu_optimizer and grocery_shopper run
+    optimized = menu_optimizer_node(state)
+    groceries = grocery_shopper_node({**state, **optimized})
+    return {
+        "messages": optimized["messages"] + groceries["messages"],
+        "optimized_meal_plan": optimized["optimized_meal_plan"],
+        "grocery_list": groceries["grocery_list"],
+    }
+
+
+def build_pipeline(checkpointer=None):
+    """Compile the fixed (check || generate) -> top up -> optimize -> push workflow.
+
+    With a checkpointer every finished stage is saved, so a failed plan resumes at the stage that failed.
+    """
+    graph = StateGraph(PipelineState)
+    # Checker, optimizer, grocery and pusher steps are the agents' own, so both modes behave the same
+    graph.add_node("check_meals", meal_checker_node)
+    graph.add_node("generate_meals", RunnableLambda(generate_meals, agenerate_meals))
+    graph.add_node("count_meals", count_meals)
+    graph.add_node("top_up_meals", RunnableLambda(top_up_meals, atop_up_meals))
+    graph.add_node("optimize_meals", optimize_meals)
+    graph.add_node("push_meals", meal_pusher_node)
+
+    # The rotation lookup and generation run in the same superstep
+    graph.add_edge(START, "check_meals")
+    graph.add_edge(START, "generate_meals")
+    graph.add_edge(["check_meals", "generate_meals"], "count_meals")
+    graph.add_conditional_edges("count_meals", route_after_check, ["top_up_meals", "optimize_meals"])
+    graph.add_edge("top_up_meals", "count_meals")
+    graph.add_edge("optimize_meals", "push_meals")
+    graph.add_edge("push_meals", END)
+    return graph.compile(name="meal_plan_pipeline", checkpointer=checkpointer)
+
+
+@functools.lru_cache(maxsize=None)
+def get_meal_plan_pipeline():
+    """Compile the pipeline on first use and reuse it afterwards."""
+    return build_pipeline(get_checkpointer())
+
+
+def get_planner():
+    """Return the planning graph selected by `planning_mode` in config.json."""
+    if load_config().get("planning_mode", "pipeline") == "supervisor":
+        from supervisors import get_top_level_supervisor
+        return get_top_level_supervisor()
+    return get_meal_plan_pipeline()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Plan a week of meals.")
+    parser.add_argument("--resume", metavar="THREAD_ID", help="Resume a failed plan from its last finished stage")
+    args = parser.parse_args()
+
+    thread_id = args.resume or new_thread_id()
+    with track_run(thread_id) as run:
+        try:
+            result = run_plan(get_planner(), {
+                "messages": [{"role": "user", "content": "Plan a balanced vegetarian meal for the week."}]
+            }, thread_id, config=run.config())
+        except Exception:
+            print(f"Plan failed. Finished stages are saved; rerun the rest with: python pipeline.py --resume {thread_id}")
+            raise
+    print(json.dumps({
+        "thread_id": thread_id,
+        "meals": [meal["name"] for meal in result.get("optimized_meal_plan", [])],
+        "grocery_list": result.get("grocery_list", {}),
+        "metrics": run.report(),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from checkpoints import finish_thread, plan_input, thread_config
+from meal_repository import bump_graph_version
+from metrics import track_run
+from settings import config_section
+
+
+PLAN_REQUEST = {"messages": [{"role": "user", "content": "Plan a balanced vegetarian meal for the week."}]}
+
+
+class PlanJob:
+    """Progress of one background planning run, updated from the graph's stream events."""
+
+    def __init__(self, session_id, user_id=None, thread_id=None):
+        self.id = uuid.uuid4().hex
+        # Checkpoint thread; a retry of a failed job reuses it to resume where the job stopped
+        self.thread_id = thread_id or self.id
+        self.session_id = session_id
+        self.user_id = user_id
+        self.status = "queued"
+        self.stage = None
+        self.stages = []
+        self.meals = []
+        self.error = None
+        self.report = None
+        self.created_at = time.time()
+        self.finished_at = None
+        self._lock = threading.Lock()
+
+    @property
+    def done(self):
+        return self.status in ("done", "failed")
+
+    def record(self, namespace, update):
+        """Apply one `updates` stream event: which node just finished and any meals it produced."""
+        with self._lock:
+            for node, values in update.items():
+                # Subgraph events carry the path of the supervisor/agent they came from
+                stage = " / ".join([part.split(":")[0] for part in namespace] + [node])
+                self.stage = stage
+                self.stages.append(stage)
+                if isinstance(values, dict):
+                    self._collect_meals(values)
+
+    def _collect_meals(self, values):
+        for key in ("selected_meals", "generated_meals", "optimized_meal_plan"):
+            for meal in values.get(key) or []:
+                name = meal.get("name") if isinstance(meal, dict) else None
+                if name and name not in self.meals:
+                    self.meals.append(name)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "id": self.id,
+                "status": self.status,
+                "stage": self.stage,
+                "stages": list(self.stages),
+                "meals": list(self.meals),
+                "error": self.error,
+                "report": self.report,
+                "elapsed": (self.finished_at or time.time()) - self.created_at,
+            }
+
+
+class PlanJobManager:
+    """Runs planning graphs on a worker pool, at most one active job per session."""
+
+    def __init__(self, max_workers=4, planner_factory=None, finished_ttl=3600):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="plan-job")
+        self._planner_factory = planner_factory
+        # Seconds a finished job stays around for its session to load it, or to retry it if it failed
+        self._finished_ttl = finished_ttl
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def submit(self, session_id, user_id=None):
+        """Start a plan for the session's household, or return its job if one is already running."""
+        with self._lock:
+            self._evict_finished()
+            job = self._jobs.get(session_id)
+            if job is not None and not job.done:
+                return job
+            resume = job is not None and job.status == "failed" and job.user_id == user_id
+            job = PlanJob(session_id, user_id, thread_id=job.thread_id if resume else None)
+            self._jobs[session_id] = job
+        self._executor.submit(self._run, job)
+        return job
+
+    def get(self, session_id):
+        with self._lock:
+            self._evict_finished()
+            return self._jobs.get(session_id)
+
+    def _evict_finished(self):
+        """Drop jobs that finished more than `finished_ttl` seconds ago; sessions that ended never ask again."""
+        cutoff = time.time() - self._finished_ttl
+        for session_id, job in list(self._jobs.items()):
+            if job.done and job.finished_at < cutoff:
+                del self._jobs[session_id]
+
+    def _planner(self):
+        if self._planner_factory is not None:
+            return self._planner_factory()
+        from pipeline import get_planner
+        return get_planner()
+
+    def _run(self, job):
+        with job._lock:
+            job.status = "running"
+        error = None
+        with track_run(job.id) as run:
+            try:
+                request = dict(PLAN_REQUEST, user_id=job.user_id) if job.user_id else PLAN_REQUEST
+                planner = self._planner()
+                config = thread_config(job.thread_id, run.config())
+                updates = planner.stream(
+                    plan_input(planner, request, config), config, stream_mode="updates", subgraphs=True
+                )
+                for namespace, update in updates:
+                    job.record(namespace, update)
+                finish_thread(planner, config)
+                status = "done"
+            except Exception as e:
+                error = str(e)
+                status = "failed"
+            finally:
+                # The push may have gone through an agent's tool call (or failed halfway); invalidate either way
+                bump_graph_version()
+        report = run.report()
+        # One update under the snapshot lock, so pollers never see a finished job without its report
+        with job._lock:
+            job.error = error
+            job.report = report
+            job.finished_at = time.time()
+            job.status = status
+
+
+_manager = None
+_manager_lock = threading.Lock()
+
+
+def get_job_manager():
+    """Return the process-wide job manager shared by all Streamlit sessions."""
+    global _manager
+    if _manager is None:
+        with _manager_lock:
+            if _manager is None:
+                settings = config_section("jobs", {"max_workers": 4, "finished_ttl": 3600})
+                _manager = PlanJobManager(
+                    max_workers=settings["max_workers"], finished_ttl=settings["finished_ttl"]
+                )
+    return _manager
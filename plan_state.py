@@ -0,0 +1,57 @@
+from langchain_core.messages import AIMessage
+from langgraph.graph import MessagesState
+from langgraph.prebuilt.chat_agent_executor import AgentState
+
+
+class PlanState(MessagesState):
+    """The plan as stages hand it on. Meals and the grocery list travel in typed fields;
+    `messages` only carries a one-line summary per stage, so prompts stay the same size
+    however many meals are in play."""
+    user_id: str
+    selected_meals: list
+    generated_meals: list
+    optimized_meal_plan: list
+    grocery_list: dict
+
+
+class ChefState(PlanState):
+    """personal_chef's input: the request in `messages` plus the recipe search to draw ideas from."""
+    recipe_query: str
+
+
+class SupervisorPlanState(AgentState, PlanState):
+    """PlanState for create_supervisor graphs, which also need the agent step counter."""
+
+
+def meal_names(meals):
+    return ", ".join(meal.get("name", "?") for meal in meals) or "none"
+
+
+def stage_summary(name, text):
+    """The single message a stage adds to the shared history."""
+    return AIMessage(content=text, name=name)
+
+
+def recycled_summary(name, meals):
+    return stage_summary(name, f"Recycled {len(meals)} meal(s) from the catalog: {meal_names(meals)}.")
+
+
+def generated_summary(name, meals):
+    return stage_summary(name, f"Generated {len(meals)} new meal(s): {meal_names(meals)}.")
+
+
+def optimized_summary(name, optimized):
+    return stage_summary(name, (
+        f"Optimized {len(optimized['optimized_meal_plan'])} meal(s): "
+        f"{optimized['unique_ingredients_before']} -> {optimized['unique_ingredients']} unique ingredients, "
+        f"{len(optimized['substitutions'])} substitution(s)."
+    ))
+
+
+def pushed_summary(name, pushed_meals):
+    return stage_summary(name, f"Pushed {len(pushed_meals)} meal(s) to the database: {', '.join(pushed_meals) or 'none'}.")
+
+
+def grocery_summary(name, grocery_list):
+    items = sum(len(category_items) for category_items in grocery_list.values())
+    return stage_summary(name, f"Grocery list ready: {items} item(s) in {len(grocery_list)} categories.")
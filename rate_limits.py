@@ -0,0 +1,168 @@
+import asyncio
+import random
+import threading
+import time
+from settings import config_section
+
+
+# Per-provider quotas, overridable from the "rate_limits" section of config.json.
+# Anthropic is metered in tokens; Tavily searches count one unit each.
+DEFAULT_LIMITS = {
+    "anthropic": {"max_concurrency": 4, "tokens_per_minute": 80000},
+    "tavily": {"max_concurrency": 2, "tokens_per_minute": 60},
+}
+
+# Backoff for retryable errors, overridable from "rate_limits.retry"
+DEFAULT_RETRY = {"max_retries": 5, "base_delay": 1.0, "max_delay": 60.0}
+
+# 429 rate limited, 503 unavailable, 529 overloaded
+RETRYABLE_STATUS = {429, 503, 529}
+
+
+class ProviderLimiter:
+    """Caps in-flight calls to one provider and meters its usage with a per-minute token bucket."""
+
+    def __init__(self, name, max_concurrency=4, tokens_per_minute=None):
+        self.name = name
+        self.tokens_per_minute = tokens_per_minute
+        self.calls = 0
+        self.tokens = 0
+        self.waited = 0.0
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._available = float(tokens_per_minute or 0)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._available = min(
+            self.tokens_per_minute,
+            self._available + (now - self._updated) * self.tokens_per_minute / 60
+        )
+        self._updated = now
+
+    def acquire(self, estimated_tokens=1):
+        """Block until a concurrency slot is free and the bucket can cover the estimate."""
+        started = time.monotonic()
+        self._slots.acquire()
+        if self.tokens_per_minute:
+            # A single call larger than the whole budget only waits for a full bucket
+            needed = min(estimated_tokens, self.tokens_per_minute)
+            while True:
+                with self._lock:
+                    self._refill()
+                    if self._available >= needed:
+                        self._available -= estimated_tokens
+                        break
+                    delay = (needed - self._available) * 60 / self.tokens_per_minute
+                time.sleep(delay)
+        with self._lock:
+            self.calls += 1
+            self.waited += time.monotonic() - started
+
+    def release(self, estimated_tokens=1, used_tokens=None):
+        """Free the slot and correct the bucket once the real usage is known."""
+        with self._lock:
+            if used_tokens is not None:
+                if self.tokens_per_minute:
+                    self._available -= used_tokens - estimated_tokens
+                self.tokens += used_tokens
+            else:
+                self.tokens += estimated_tokens
+        self._slots.release()
+
+    def stats(self):
+        with self._lock:
+            return {"calls": self.calls, "tokens": self.tokens, "waited_seconds": round(self.waited, 2)}
+
+
+def is_retryable(error):
+    """True for rate-limit and overload errors from the Anthropic SDK or an HTTP client."""
+    status = getattr(error, "status_code", None)
+    if status is None:
+        status = getattr(getattr(error, "response", None), "status_code", None)
+    if status in RETRYABLE_STATUS:
+        return True
+    message = str(error).lower()
+    return "rate limit" in message or "overloaded" in message
+
+
+def backoff_delays(max_retries, base_delay, max_delay):
+    """Exponential backoff with full jitter."""
+    for attempt in range(max_retries):
+        yield random.uniform(0, min(max_delay, base_delay * 2 ** attempt))
+
+
+def retry_settings(path="config.json"):
+    return dict(DEFAULT_RETRY, **config_section("rate_limits", {}, path).get("retry", {}))
+
+
+def _retry_delays():
+    settings = retry_settings()
+    return backoff_delays(settings["max_retries"], settings["base_delay"], settings["max_delay"])
+
+
+def call_with_retry(fn, limiter, estimated_tokens=1, usage=None):
+    """Run `fn` under the provider's limits, retrying retryable errors with backoff.
+
+    `usage` maps the result to the tokens actually used, when the provider reports it.
+    """
+    delays = _retry_delays()
+    while True:
+        limiter.acquire(estimated_tokens)
+        used = None
+        try:
+            result = fn()
+            used = usage(result) if usage else None
+            return result
+        except Exception as e:
+            delay = next(delays, None)
+            if delay is None or not is_retryable(e):
+                raise
+            print(f"{limiter.name}: {e.__class__.__name__}, retrying in {delay:.1f}s")
+        finally:
+            limiter.release(estimated_tokens, used)
+        time.sleep(delay)
+
+
+async def acall_with_retry(afn, limiter, estimated_tokens=1, usage=None):
+    """Async variant of call_with_retry; waiting for the limiter happens off the event loop."""
+    delays = _retry_delays()
+    while True:
+        await asyncio.to_thread(limiter.acquire, estimated_tokens)
+        used = None
+        try:
+            result = await afn()
+            used = usage(result) if usage else None
+            return result
+        except Exception as e:
+            delay = next(delays, None)
+            if delay is None or not is_retryable(e):
+                raise
+            print(f"{limiter.name}: {e.__class__.__name__}, retrying in {delay:.1f}s")
+        finally:
+            limiter.release(estimated_tokens, used)
+        await asyncio.sleep(delay)
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def get_limiter(provider):
+    """Return the process-wide limiter for a provider, shared by every thread that calls it."""
+    with _limiters_lock:
+        if provider not in _limiters:
+            limits = config_section("rate_limits", {}).get(provider, {})
+            settings = dict(DEFAULT_LIMITS.get(provider, {}), **limits)
+            _limiters[provider] = ProviderLimiter(
+                provider,
+                max_concurrency=settings.get("max_concurrency", 4),
+                tokens_per_minute=settings.get("tokens_per_minute"),
+            )
+        return _limiters[provider]
+
+
+def limiter_stats():
+    with _limiters_lock:
+        return {name: limiter.stats() for name, limiter in _limiters.items()}
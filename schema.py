@@ -0,0 +1,139 @@
+import argparse
+import threading
+
+
+# Ordered, append-only list of schema migrations. Each step is idempotent, and the
+# highest applied version is recorded as a (:SchemaMigration) node in the graph.
+MIGRATIONS = [
+    (1, "meal_and_ingredient_keys", [
+        "CREATE CONSTRAINT meal_name_unique IF NOT EXISTS FOR (m:Meal) REQUIRE m.name IS UNIQUE",
+        "CREATE CONSTRAINT ingredient_name_unique IF NOT EXISTS FOR (i:Ingredient) REQUIRE i.name IS UNIQUE",
+        "CREATE INDEX meal_last_shown IF NOT EXISTS FOR (m:Meal) ON (m.last_shown)",
+    ]),
+    # Rotation queries filter on a plain range predicate, so never-shown meals need a date
+    (2, "backfill_last_shown", [
+        "MATCH (m:Meal) WHERE m.last_shown IS NULL SET m.last_shown = date('1970-01-01')",
+    ]),
+    # Rotation history moves to per-household (:User)-[:SHOWN {date}]->(:Meal) relationships.
+    # Every last_shown date except migration 2's backfill becomes the default household's history. That includes
+    # meals the old create_meal_graph stamped "three weeks ago" when it created them, which cannot be told
+    # apart from shown meals; they keep the rotation place they had under the global property, behind meals
+    # the household has never seen.
+    # Meal.last_shown is legacy after this step: nothing reads or writes it any more.
+    (3, "per_user_shown_history", [
+        "CREATE CONSTRAINT user_id_unique IF NOT EXISTS FOR (u:User) REQUIRE u.id IS UNIQUE",
+        "CREATE INDEX shown_date IF NOT EXISTS FOR ()-[s:SHOWN]-() ON (s.date)",
+        "MATCH (m:Meal) WHERE m.last_shown > date('1970-01-01') "
+        "MERGE (u:User {id: 'default'}) MERGE (u)-[s:SHOWN]->(m) ON CREATE SET s.date = m.last_shown",
+    ]),
+    # Duplicate checks look candidate names up by their words instead of listing the catalog
+    (4, "meal_name_fulltext", [
+        "CREATE FULLTEXT INDEX meal_name_fulltext IF NOT EXISTS FOR (m:Meal) ON EACH [m.name]",
+    ]),
+]
+
+# Representative queries checked by the index report, with the operator we expect to see
+INDEX_CHECKS = {
+    "meal_by_name": (
+        "MATCH (m:Meal {name: $name}) RETURN m",
+        {"name": ""},
+    ),
+    "ingredient_by_name": (
+        "MATCH (i:Ingredient {name: $name}) RETURN i",
+        {"name": ""},
+    ),
+    "meal_rotation": (
+        "MATCH (u:User {id: $user_id})-[s:SHOWN]->(m:Meal) WHERE s.date < date() - duration({weeks: $weeks}) "
+        "RETURN m.name ORDER BY s.date ASC LIMIT $count",
+        {"user_id": "default", "weeks": 2, "count": 4},
+    ),
+    "recently_shown": (
+        "MATCH ()-[s:SHOWN]->() WHERE s.date >= date() - duration({weeks: $weeks}) RETURN count(s)",
+        {"weeks": 1},
+    ),
+}
+
+_applied = False
+_applied_lock = threading.Lock()
+
+
+def current_version(driver):
+    """Return the highest migration version recorded in the graph, or 0."""
+    with driver.session() as session:
+        record = session.run("MATCH (s:SchemaMigration) RETURN max(s.version) AS version").single()
+        return record["version"] or 0
+
+
+def migrate(driver):
+    """Apply any pending migrations in order and return the resulting schema version."""
+    version = current_version(driver)
+    with driver.session() as session:
+        for migration_version, name, statements in MIGRATIONS:
+            if migration_version <= version:
+                continue
+            # Schema statements cannot share a transaction with data writes
+            for statement in statements:
+                session.run(statement).consume()
+            session.run(
+                """
+                MERGE (s:SchemaMigration {version: $version})
+                ON CREATE SET s.name = $name, s.applied_at = datetime()
+                """,
+                version=migration_version,
+                name=name
+            ).consume()
+            print(f"Applied schema migration {migration_version}: {name}")
+            version = migration_version
+    return version
+
+
+def ensure_schema(driver):
+    """Run migrations once per process, even when several threads get here first."""
+    global _applied
+    if not _applied:
+        with _applied_lock:
+            if not _applied:
+                migrate(driver)
+                _applied = True
+
+
+def _plan_operators(plan):
+    """Flatten an EXPLAIN plan tree into its operator names."""
+    operators = [plan["operatorType"].split("@")[0]]
+    for child in plan.get("children", []):
+        operators.extend(_plan_operators(child))
+    return operators
+
+
+def index_usage_report(driver):
+    """EXPLAIN the hot queries and report whether each is served by an index or a label scan."""
+    report = {}
+    with driver.session() as session:
+        for name, (query, parameters) in INDEX_CHECKS.items():
+            plan = session.run("EXPLAIN " + query, parameters).consume().plan
+            operators = _plan_operators(plan)
+            report[name] = {
+                "uses_index": any("Index" in operator for operator in operators),
+                "label_scan": any(operator in ("NodeByLabelScan", "AllNodesScan") for operator in operators),
+                "operators": operators,
+            }
+    return report
+
+
+def main():
+    from meal_repository import get_driver
+
+    parser = argparse.ArgumentParser(description="Apply graph schema migrations and report index usage.")
+    parser.add_argument("--report", action="store_true", help="Print whether the hot queries use indexes")
+    args = parser.parse_args()
+
+    driver = get_driver()
+    print(f"Schema version: {migrate(driver)}")
+    if args.report:
+        for name, entry in index_usage_report(driver).items():
+            status = "index" if entry["uses_index"] and not entry["label_scan"] else "SCAN"
+            print(f"{name:20} {status:6} {' -> '.join(entry['operators'])}")
+
+
+if __name__ == "__main__":
+    main()
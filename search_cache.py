@@ -0,0 +1,144 @@
+import json
+import os
+import re
+import threading
+from metrics import track_call
+from rate_limits import call_with_retry, get_limiter
+from settings import config_section, load_config
+from ttl_store import TTLStore
+
+
+DEFAULT_SETTINGS = {
+    "backend": "tavily",
+    "max_results": 2,
+    "path": ".search_cache.sqlite",
+    "ttl_seconds": 30 * 24 * 3600,
+    "max_entries": 2000,
+    "offline": False,
+    "static_results_path": None,
+}
+
+_STOPWORDS = {"a", "an", "and", "the", "for", "of", "with", "to", "in", "on", "recipe", "recipes", "how", "make"}
+
+
+def normalize_query(query):
+    """Reduce a query to a sorted set of meaningful words so near-identical searches share a key."""
+    words = re.findall(r"[a-z0-9]+", query.lower())
+    return " ".join(sorted({word for word in words if word not in _STOPWORDS}))
+
+
+class TavilyBackend:
+    """Live web search through Tavily."""
+
+    def __init__(self, max_results=2):
+        from langchain_community.tools.tavily_search import TavilySearchResults
+
+        # Tavily API key, only needed once a live search is actually made. This runs on worker
+        # threads with no terminal, so a missing key is an error rather than a prompt.
+        if not os.environ.get("TAVILY_API_KEY"):
+            os.environ["TAVILY_API_KEY"] = load_config().get("TAVILY_API_KEY", "")
+
+        if not os.environ.get("TAVILY_API_KEY"):
+            raise RuntimeError(
+                "No Tavily API key: set TAVILY_API_KEY in the environment or in config.json, "
+                'or use "search": {"offline": true} or {"backend": "static"}'
+            )
+
+        self.tool = TavilySearchResults(max_results=max_results)
+
+    def search(self, query):
+        # The tool itself turns HTTP errors into a returned string, so the API wrapper is called
+        # directly: 429s and 5xx raise into call_with_retry and are retried with backoff
+        wrapper = self.tool.api_wrapper
+        with track_call("tavily", "search"):
+            return call_with_retry(
+                lambda: wrapper.results(query, max_results=self.tool.max_results, search_depth=self.tool.search_depth),
+                get_limiter("tavily"),
+            )
+
+
+class StaticSearchBackend:
+    """Local stand-in that answers from a fixed list of results, for tests and offline development.
+
+    Each result is a {"url", "content"} dict; a result matches when it shares a word with the query.
+    """
+
+    def __init__(self, results=(), max_results=2):
+        self.results = list(results)
+        self.max_results = max_results
+        self.calls = 0
+
+    @classmethod
+    def from_file(cls, path, max_results=2):
+        with open(path, encoding="utf-8") as f:
+            return cls(json.load(f), max_results)
+
+    def search(self, query):
+        self.calls += 1
+        words = set(normalize_query(query).split())
+        scored = [
+            (len(words & set(normalize_query(result["content"]).split())), result)
+            for result in self.results
+        ]
+        return [result for score, result in sorted(scored, key=lambda item: -item[0]) if score][:self.max_results]
+
+
+class CachedSearch:
+    """Search wrapper that serves repeated queries from an on-disk TTL/LRU cache."""
+
+    def __init__(self, backend, store, offline=False):
+        self.backend = backend
+        self.store = store
+        self.offline = offline
+
+    def search(self, query):
+        key = normalize_query(query)
+        cached = self.store.get(key)
+        if cached is not None:
+            results = json.loads(cached)
+            # Entries written before error replies were kept out of the cache can hold an error string
+            if isinstance(results, list):
+                return results
+        if self.offline:
+            return []
+        results = self.backend.search(query)
+        # Only real result lists are cached; an error reply must not be served for the whole TTL
+        if not isinstance(results, list):
+            print(f"Search for {query!r} returned no results list: {str(results)[:200]}")
+            return []
+        self.store.set(key, json.dumps(results))
+        return results
+
+    def stats(self):
+        return self.store.stats()
+
+
+def load_search_settings(path="config.json"):
+    return config_section("search", DEFAULT_SETTINGS, path)
+
+
+def build_search(settings=None):
+    """Create the cached search configured by the "search" section of config.json."""
+    settings = settings or load_search_settings()
+    if settings["backend"] == "static":
+        backend = StaticSearchBackend.from_file(settings["static_results_path"], settings["max_results"])
+    elif settings["offline"]:
+        backend = None
+    else:
+        backend = TavilyBackend(settings["max_results"])
+    store = TTLStore(settings["path"], "search_cache", settings["ttl_seconds"], settings["max_entries"])
+    return CachedSearch(backend, store, offline=settings["offline"])
+
+
+_search = None
+_search_lock = threading.Lock()
+
+
+def get_search():
+    """Return the shared cached search, creating it on first use."""
+    global _search
+    if _search is None:
+        with _search_lock:
+            if _search is None:
+                _search = build_search()
+    return _search
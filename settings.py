@@ -0,0 +1,16 @@
+import functools
+import json
+
+
+@functools.lru_cache(maxsize=None)
+def load_config(path="config.json"):
+    """Read config.json once per process."""
+    with open(path) as f:
+        return json.load(f)
+
+
+def config_section(name, defaults, path="config.json"):
+    """Return a copy of a config.json section merged over its defaults."""
+    settings = dict(defaults)
+    settings.update(load_config(path).get(name, {}))
+    return settings
@@ -1,151 +1,155 @@
-from langgraph_supervisor import create_supervisor
-from langchain_anthropic import ChatAnthropic
-from agents import meal_checker,personal_chef,menu_optimizer,grocery_shopper,meal_pusher
-
-# Load API keys securely
+import argparse
+import functools
 import json
-with open('config.json') as f:
-    config = json.load(f)
-ANTHROPIC_API_KEY = config["ANTHROPIC_API_KEY"]
-
-
-# Meal Checker Supervisor: Retrieves 4 meals from Neo4j
-model2 = ChatAnthropic(model="claude-3-7-sonnet-20250219", api_key=ANTHROPIC_API_KEY)
-model = ChatAnthropic(model="claude-3-5-haiku-20241022", api_key=ANTHROPIC_API_KEY)
-
-
-
-meal_checker_supervisor = create_supervisor(
-    [meal_checker],
-    model=model,
-    prompt=(
-        "You are responsible for retrieving ** meals from the database**."
-        "These meals should not have been shown in the past 2 weeks, ensuring variety while maintaining efficiency."
-        "Do not generate new meals. Fetch all ** meals** and return them."
-        "Format the response as:\n"
-        "{\n"
-        '  "selected_meals": [\n'
-        '    {\n'
-        '      "name": <string>,\n'
-        '      "instructions": <string>\n'
-        '    },\n'
-        '    ...\n'
-        '  ]\n'
-        "}"
-    )
-).compile(name="meal_checker_supervisor")
-
-
-meal_generator_supervisor = create_supervisor(
-    [personal_chef],
-    model=model,
-    prompt=(
-        "<instructions>"
-        "You are responsible for generating **new meals** and adding them to the database."
-        "1️. **First, generate  new vegetarian meals** via `personal_chef`.\n"
-        "Return confirmation of stored meals in the JSON format:\n"
-        "</instructions>"
-        "<Response Format>"
-        "{\n"
-        '  "generated_meals": [\n'
-        '    {\n'
-        '      "name": <string>,\n'
-        '      "main_ingredients": [<string>, ...],\n'
-        '      "protein_source": [<string>, ...],\n'
-        '      "cooking_method": <string>,\n'
-        '      "instructions": <detailed step-by-step instructions as a string>\n'
-        '    }\n'
-        '  ],\n'
-        "}"
-        "</Response Format>"
+from agents import (
+    chat_model, HAIKU, SONNET, build_meal_checker, get_menu_optimizer, get_grocery_shopper, get_meal_pusher,
+)
+from checkpoints import get_checkpointer, new_thread_id, run_plan
+
+
+# Stages share a typed plan state (selected/generated meals, optimized plan, grocery list)
+# and each adds one summary line to the conversation, so supervisors reply in one line too.
+STATE_NOTE = (
+    "The meals, the optimized plan and the grocery list are kept in the shared plan state, "
+    "not in the conversation: every agent reports back with a one-line summary. "
+    "Do not repeat meal details; when your steps are done, reply with a one-line summary."
+)
+
+
+def build_generation_stage(name="personal_chef"):
+    """Wrap personal_chef so it generates only the missing meals from the plan state, in parallel
+    batches, and hands back the validated meals plus a summary line."""
+    from langgraph.graph import END, START, StateGraph
+    from pipeline import fan_out_generation, plan_size
+    from plan_state import PlanState, generated_summary
+
+    def generation_node(state: PlanState):
+        generated = state.get("generated_meals") or []
+        existing = (state.get("selected_meals") or []) + generated
+        meals = fan_out_generation(max(plan_size() - len(existing), 0), existing)
+        return {"generated_meals": generated + meals, "messages": [generated_summary(name, meals)]}
+
+    graph = StateGraph(PlanState)
+    graph.add_node(name, generation_node)
+    graph.add_edge(START, name)
+    graph.add_edge(name, END)
+    return graph.compile(name=name)
+
+
+def handoff_tool(agent_name):
+    """create_supervisor's handoff tool for `agent_name`, minus the supervisor's step counter.
+
+    The stock tool hands the supervisor agent's whole state to the workflow, including the
+    managed `remaining_steps`, which is not a channel there; the workflow would drop it with
+    a warning on every handoff.
+    """
+    from langgraph_supervisor import create_handoff_tool
+
+    tool = create_handoff_tool(agent_name=agent_name)
+    handoff = tool.func
+
+    @functools.wraps(handoff)
+    def handoff_without_step_counter(state, **kwargs):
+        return handoff({key: value for key, value in state.items() if key != "remaining_steps"}, **kwargs)
+
+    tool.func = handoff_without_step_counter
+    return tool
+
+
+@functools.lru_cache(maxsize=None)
+def get_top_level_supervisor():
+    """Build the supervisor hierarchy on first use; importing this module builds nothing."""
+    from langgraph_supervisor import create_supervisor
+    from plan_state import SupervisorPlanState
+
+    def supervisor(agents, model, prompt, name, checkpointer=None):
+        # Only each agent's final summary goes back up the hierarchy
+        return create_supervisor(
+            agents, model=model, prompt=prompt + "\n" + STATE_NOTE,
+            tools=[handoff_tool(agent.name) for agent in agents],
+            state_schema=SupervisorPlanState, output_mode="last_message",
+        ).compile(name=name, checkpointer=checkpointer)
+
+    # The rotation lookup needs no routing decision, so this "supervisor" is the deterministic checker graph
+    meal_checker_supervisor = build_meal_checker(name="meal_checker_supervisor")
+
+    meal_generator_supervisor = supervisor(
+        [build_generation_stage()],
+        chat_model(HAIKU, "meal_generator_supervisor"),
+        "You are responsible for generating **new meals**. "
+        "Generate the new vegetarian meals the plan still needs via `personal_chef`.",
+        "meal_generator_supervisor",
     )
-).compile(name="meal_generator_supervisor")
-
 
-
-# Meal Optimization and Grocery Supervisor: Optimizes and prepares grocery list
-meal_optimization_supervisor = create_supervisor(
-    [menu_optimizer, grocery_shopper],
-    model=model,
-    prompt=(
+    # Meal Optimization and Grocery Supervisor: Optimizes and prepares grocery list
+    meal_optimization_supervisor = supervisor(
+        [get_menu_optimizer(), get_grocery_shopper()],
+        chat_model(HAIKU, "meal_optimization_supervisor"),
         "You are responsible for optimizing the meal plan and generating a structured grocery list. "
-        "Ensure the ingredients are consolidated to **minimize unique ingredient purchases** while keeping meals balanced. "
-        "Return the optimized meal plan and grocery list in the following JSON format:\n"
-        "<Response>"
-        "{\n"
-        '  "optimized_meal_plan": [\n'
-        '    {\n'
-        '      "name": <string>,\n'
-        '      "main_ingredients": [<string>, ...],\n'
-        '      "protein_source": [<string>, ...],\n'
-        '      "cooking_method": <string>,\n'
-        '      "instructions": <detailed step-by-step instructions as a string>\n'
-        '    },\n'
-        '    ...\n'
-        '  ],\n'
-        '  "grocery_list": [<string>, ...]\n'
-        "}\n"
-        "</Response>"
+        "First consolidate the ingredients via `menu_optimizer` to **minimize unique ingredient purchases**, "
+        "then build the categorized grocery list via `grocery_shopper`.",
+        "meal_optimization_supervisor",
     )
-).compile(name="meal_optimization_supervisor")
-
 
-# Define the meal_pusher_supervisor
-meal_pusher_supervisor = create_supervisor(
-    [meal_pusher],
-    model=model,
-    prompt=(
+    # Define the meal_pusher_supervisor
+    meal_pusher_supervisor = supervisor(
+        [get_meal_pusher()],
+        chat_model(HAIKU, "meal_pusher_supervisor"),
         "You are responsible for pushing meals into the Neo4j database. "
-        "Ensure each meal is not already in the database before inserting it. "
-        "make sure detailed cooking instructions are pushed to the database"
-        "Return confirmation of pushed meals in the following JSON format:\n"
-        "{\n"
-        '  "pushed_meals": []\n'
-        "}\n"
+        "Push the optimized meal plan, with its detailed cooking instructions, via `meal_pusher`.",
+        "meal_pusher_supervisor",
     )
-).compile(name="meal_pusher_supervisor")
 
-
-
-
-
-top_level_supervisor = create_supervisor(
-    [meal_checker_supervisor, meal_generator_supervisor, meal_optimization_supervisor, meal_pusher_supervisor],
-    model=model2,
-    prompt=(
+    top_level_supervisor = supervisor(
+        [meal_checker_supervisor, meal_generator_supervisor, meal_optimization_supervisor, meal_pusher_supervisor],
+        chat_model(SONNET, "top_level_supervisor"),
         "<Instructions>"
         "You manage the meal planning workflow. **Follow this sequence:**\n"
-        "1. **Retrieve 4 meals** from the database via the **meal checker supervisor**.\n"
-        "2. If **4 meals are not retrieved** from the **meal checker supervisor**, generate **6 new meals** via the **meal generator supervisor**; if **4 meals are retrieved**, generate only **2 new meals**.\n"
+        "1. **Retrieve meals** from the database via the **meal checker supervisor**.\n"
+        "2. Generate the remaining new meals via the **meal generator supervisor**.\n"
         "3. **Optimize ingredients and generate a grocery list** via the **meal optimization supervisor**.\n"
-        "4. make sure the the **meal_pusher_supervisor** get all the exact same meal deatils that the **meal_optimization_supervisor** genearted \n"
-        "5. Use the **meal_pusher_supervisor** to push all the optimized meals obtained from the **meal optimization supervisor** to the database.\n"
-        "6. **Final Output Requirement:** The final JSON response ** MUST be the exact SAME EXACT MEALS and GROCERY LIST that were pushed to the database** do not generate any new meals names or grocery items. Ensure that all grocery items are categorized correctly under their respective sections and that the response is not truncated.\n"
-        "</Instructions>"
-        
-        "<Response>"
-        "Your response **MUST** be a valid JSON object with the following format, reflecting the meals and grocery list exactly as they were pushed to the database:\n\n"
-        "```json\n"
-        "{\n"
-        '    "meals": ["optimized_meal 1", "optimized_meal 2", "optimized_meal 3", "optimized_meal 4", "optimized_meal 5", "optimized_meal 6"],\n'
-        '    "grocery_list": {\n'
-        '        "Fruits & Vegetables": ["Item1", "Item2"],\n'
-        '        "Dairy": ["Item3", "Item4"],\n'
-        '        "Meat & Seafood": ["Item5"],\n'
-        '        "Pantry": ["Item6", "Item7"]\n'
-        "    }\n"
-        "}\n"
-        "```\n"
-        "</Response>"
+        "4. Push the optimized meals to the database via the **meal_pusher_supervisor**.\n"
+        "</Instructions>",
+        "top_level_supervisor",
+        # Nested supervisors and agents checkpoint into the same thread, so a resumed plan
+        # also skips the finished steps inside the stage that failed
+        checkpointer=get_checkpointer(),
     )
-).compile(name="top_level_supervisor")
-
 
-result = top_level_supervisor.invoke({
-    "messages": [
-        {
-            "role": "user",
-            "content": "Plan a balanced vegetarian meal for the week."
-        }
-    ]
-})
\ No newline at end of file
+    return top_level_supervisor
+
+
+def __getattr__(name):
+    # Keep `from supervisors import top_level_supervisor` working lazily
+    if name == "top_level_supervisor":
+        return get_top_level_supervisor()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Plan a week of meals with the LLM-routed supervisors.")
+    parser.add_argument("--resume", metavar="THREAD_ID", help="Resume a failed plan from its last finished step")
+    args = parser.parse_args()
+
+    thread_id = args.resume or new_thread_id()
+    try:
+        result = run_plan(get_top_level_supervisor(), {
+            "messages": [
+                {
+                    "role": "user",
+                    "content": "Plan a balanced vegetarian meal for the week."
+                }
+            ]
+        }, thread_id)
+    except Exception:
+        print(f"Plan failed. Finished steps are saved; rerun the rest with: python supervisors.py --resume {thread_id}")
+        raise
+    print(json.dumps({
+        "thread_id": thread_id,
+        "meals": [meal["name"] for meal in result.get("optimized_meal_plan", [])],
+        "grocery_list": result.get("grocery_list", {}),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()